@@ -0,0 +1,442 @@
+# Any copyright is dedicated to the Public Domain.
+# https://creativecommons.org/publicdomain/zero/1.0/
+
+# Версия 2023-02-23
+
+"""Benchmarks of the arithmetic core.
+
+Run all benchmarks:
+
+    python3 bench.py
+
+or only the chosen ones (by name):
+
+    python3 bench.py rational_memory rational_ops
+
+"""
+
+from sys import argv as sysArgv
+from timeit import repeat
+import tracemalloc
+
+from rationals import Rational as Frac
+import mixednum as MNum
+
+def best_time(stmt, number, rounds = 5):
+    """the best time (in seconds) of one run of stmt"""
+    return(min(repeat(stmt, number = number, repeat = rounds)) / number)
+
+def report(title, seconds):
+    print('{title:<48} {usec:>12.3f} usec'.format(title = title, usec = seconds * 1e6))
+
+# ==========RATIONAL[
+
+def rational_memory(count = 100000):
+    """memory held by a list of rationals"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    fracs = [Frac(i % 7, i % 5, 5 + i % 11, bool(i % 2)) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('{title:<48} {size:>12.1f} bytes'.format(
+        title = 'Rational: memory per instance'
+        ,size = (after - before) / len(fracs)
+        )
+    )
+
+def rational_ops():
+    """throughput of the basic operations"""
+    a = Frac(3, 5, 7)
+    b = Frac(0, 11, 13, True)
+    report('Rational: construct', best_time(lambda: Frac(3, 5, 7), 20000))
+    report('Rational: add',       best_time(lambda: a.add(b), 20000))
+    report('Rational: mul',       best_time(lambda: a.mul(b), 20000))
+    report('Rational: mixed',     best_time(lambda: a.mixed(), 20000))
+    report('Rational: intComp',   best_time(lambda: a.intComp(b), 20000))
+
+def rational_compare(count = 1000):
+    """comparison of fractions with different denominators"""
+    fracs = [Frac(0, (i * 7919) % 1009, 1 + i % 97, bool(i % 3)) for i in range(count)]
+    a = Frac(0, 735399, 800)
+    b = Frac(0, 1429, 3704)
+    report('Rational: intComp (other denominator)', best_time(lambda: a.intComp(b), 20000))
+    report('Rational: sorted, {count} items'.format(count = count)
+           ,best_time(lambda: sorted(fracs), 20))
+
+def rational_big():
+    """large exponents and large denominators"""
+    a = Frac(0, 735399, 800)
+    b = Frac(0, 2 ** 89 - 1, 3 ** 57)
+    c = Frac(0, 5 ** 61, 2 ** 127 - 1, True)
+    report('Rational: pow(3)',          best_time(lambda: a.pow(3), 20000))
+    report('Rational: pow(-3)',         best_time(lambda: a.pow(-3), 20000))
+    report('Rational: pow(200)',        best_time(lambda: a.pow(200), 200))
+    report('Rational: mul (large)',     best_time(lambda: b.mul(c), 20000))
+    report('Rational: div (large)',     best_time(lambda: b.div(c), 20000))
+    report('Rational: gcd (large)',     best_time(lambda: Frac.gcd(2 ** 521 - 1, 3 ** 300), 20000))
+
+def rational_sum(count = 1000):
+    """long sums: step-by-step add against the accumulator"""
+    fracs = [Frac(0, 1 + i % 13, 1 + i % 60, bool(i % 2)) for i in range(count)]
+    def chain():
+        total = Frac()
+        for frac in fracs:
+            total = total.add(frac)
+        return total
+    report('Rational: add chain, {count} items'.format(count = count), best_time(chain, 20))
+    report('Rational: sum, {count} items'.format(count = count),       best_time(lambda: Frac.sum(fracs), 20))
+
+def rational_bounded(depth = 2000, maxDen = 10 ** 6):
+    """deep chains of conversion rates: exact against bounded denominators"""
+    # pairs of close decimal rates (conversions "there and back" through different tables)
+    rates = [
+        (Frac(735, 49875, 100000),  Frac(735, 5, 10))              # лс, ватт
+        ,(Frac(0, 3048, 10000),     Frac(0, 30479, 100000))        # foot
+        ,(Frac(1, 852, 1000),       Frac(1, 8520001, 10000000))    # n.mile
+        ,(Frac(0, 45359237, 10 ** 8), Frac(0, 4536, 10000))        # pound
+    ]
+    def chain(maxDen = None):
+        result = Frac(1)
+        for i in range(depth):
+            there, back = rates[i % len(rates)]
+            result = result.mul(there).div(back)
+            if maxDen != None:
+                # every intermediate result is rounded
+                result = result.limit_denominator(maxDen)
+        return result
+
+    exact = chain()
+    report('Rational: chain of {depth}, exact'.format(depth = depth), best_time(chain, 5))
+    bounded = chain(maxDen)
+    report('Rational: chain of {depth}, denominators <= {maxDen}'.format(depth = depth, maxDen = maxDen)
+           ,best_time(lambda: chain(maxDen), 5))
+    print('{title:<48} {error:>12.3e}'.format(
+        title = 'Rational: relative error of bounded chain'
+        ,error = abs(bounded.sub(exact).div(exact).decimal())
+        )
+    )
+
+def rational_array(count = 10000):
+    """vectorized arithmetic (numpy) against the loop over Rational"""
+    try:
+        from rationalarray import RationalArray
+    except ImportError:
+        print('RationalArray: numpy is not installed')
+        return
+    left  = [Frac(0, 1 + i % 997, 1 + i % 89, bool(i % 2)) for i in range(count)]
+    right = [Frac(i % 5, 1 + i % 31, 2 + i % 53) for i in range(count)]
+    arLeft  = RationalArray.from_rationals(left)
+    arRight = RationalArray.from_rationals(right)
+    for name in ('add', 'mul', 'div', 'intComp'):
+        method = getattr(Frac, name)
+        arMethod = getattr(RationalArray, name)
+        report('Rational: loop {name}, {count} items'.format(name = name, count = count)
+               ,best_time(lambda: [method(a, b) for a, b in zip(left, right)], 5))
+        report('RationalArray: {name}, {count} items'.format(name = name, count = count)
+               ,best_time(lambda: arMethod(arLeft, arRight), 5))
+    report('RationalArray: from_rationals, {count} items'.format(count = count)
+           ,best_time(lambda: RationalArray.from_rationals(left), 5))
+
+def rational_decimal():
+    """decimal notation: float against exact"""
+    from ratiostr import RatioString as FStr
+    small = Frac(1429, 2575, 3704)
+    large = Frac(0, 735399 ** 40, 800 ** 40 + 1)
+    report('Rational: decimal() float',               best_time(lambda: small.decimal(), 20000))
+    report('RatioString: to_decimal, 20 digits',      best_time(lambda: FStr.to_decimal(small), 20000))
+    report('RatioString: to_decimal, period',         best_time(lambda: FStr.to_decimal(small, 20, period = True), 20000))
+    report('Rational: decimal() float, large',        best_time(lambda: large.decimal(), 2000))
+    report('RatioString: to_decimal, large, 50 digits', best_time(lambda: FStr.to_decimal(large, 50), 2000))
+
+def rational_interop():
+    """conversions from int and fractions.Fraction, mixed operands"""
+    from fractions import Fraction
+    from ratiostr import RatioString as FStr
+    value = Fraction(735399, 800)
+    a = Frac(3, 5, 7)
+    report('Rational: from string',          best_time(lambda: FStr.from_string('919.199/800'), 20000))
+    report('Rational: from parts',           best_time(lambda: Frac(0, value.numerator, value.denominator), 20000))
+    report('Rational: from_fraction',        best_time(lambda: Frac.from_fraction(value), 20000))
+    report('Rational: from_int',             best_time(lambda: Frac.from_int(1852), 20000))
+    report('Rational: as_fraction',          best_time(lambda: a.as_fraction(), 20000))
+    report('Rational: mul by Rational(int)', best_time(lambda: a.mul(Frac(1852)), 20000))
+    report('Rational: mul by int',           best_time(lambda: a.mul(1852), 20000))
+    report('Rational: mul by Fraction',      best_time(lambda: a.mul(value), 20000))
+
+def ratio_parse(count = 10000):
+    """parsing of fractions"""
+    from ratiostr import RatioString as FStr
+    strings = ['{neg}{i}.{n}/{d} m'.format(neg = '-' if i % 2 else '', i = i, n = i % 7, d = 7 + i % 13) for i in range(count)]
+    report('RatioString: from_string, {count} items'.format(count = count)
+           ,best_time(lambda: [FStr.from_string(el) for el in strings], 5))
+    report('RatioString: parse_many, {count} items'.format(count = count)
+           ,best_time(lambda: FStr.parse_many(strings), 5))
+
+# ==========]RATIONAL
+
+# ==========MIXED[
+
+def mixed_duplicates(count = 1000):
+    """construction of a mixed number from many same-measure elements"""
+    measures = [MNum.Measure((MNum.MsrPart(name),)) for name in ('hour', 'min', 'sec')]
+    elems = [MNum.Elem(Frac(0, 1 + i % 13, 1 + i % 60), measures[i % 3]) for i in range(count)]
+    report('MixedNum: {count} elements, 3 measures'.format(count = count), best_time(lambda: MNum.MixedNum(elems), 20))
+
+def mixed_memory(count = 5000):
+    """memory held by mixed numbers: parsed and computed (divided and folded)"""
+    from mixedstr import MixedString as MStr
+    lines = journal_lines(count + 1)
+    MStr.from_string(lines[0])
+    for title, make in (
+        ('parsed',     lambda: [MStr.from_string(el) for el in lines[1:]])
+        ,('computed', lambda: [a.mul(b.reciprocal()).fold_measures() for a, b in zip(parsed, parsed[1:])])
+    ):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        nums = make()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        if title == 'parsed':
+            parsed = nums
+        print('{title:<48} {size:>12.1f} bytes'.format(
+            title = 'MixedNum: memory per instance, {title}'.format(title = title)
+            ,size = (after - before) / len(nums)
+            )
+        )
+
+def mixed_chain(depth = 30):
+    """chains of multiplications: measures grow after every step (like "/ 1 hour, 30 min", "* 3/4 hour")"""
+    from mixedstr import MixedString as MStr
+    start   = MStr.from_string('7 dozen*mile; 10500 yard; 180 foot')
+    divisor = MStr.from_string('1 hour; 30 min').reciprocal()
+    factor  = MStr.from_string('3/4 hour')
+    def chain():
+        result = start
+        for i in range(depth):
+            result = result.mul(divisor if i % 2 else factor)
+        return result
+    def folded():
+        result = start
+        for i in range(depth):
+            result = result.mul(divisor if i % 2 else factor, True)
+        return result
+    result = chain()
+    report('MixedNum: mul chain of {depth}'.format(depth = depth),         best_time(chain, 5))
+    report('MixedNum: mul chain of {depth}, folded'.format(depth = depth), best_time(folded, 5))
+    report('MixedNum: fold_measures after the chain',            best_time(result.fold_measures, 5))
+    measures = [el.measure for el in result.list]
+    report('Measure: combine of the chain measures',             best_time(lambda: measures[0].combine(*measures[1:]), 5))
+    report('Measure: negation of the chain measures',            best_time(lambda: [-el for el in measures], 5))
+
+def mixed_compose(count = 300):
+    """composition of numbers with hundreds of distinct measures"""
+    measures = [
+        MNum.Measure((MNum.MsrPart('u{i}'.format(i = i % 50)), MNum.MsrPart('v{i}'.format(i = i // 50), -1)))
+        for i in range(2 * count)
+    ]
+    left  = MNum.MixedNum([MNum.Elem(Frac(0, 1 + i % 13, 1 + i % 7), measures[i]) for i in range(count)])
+    right = MNum.MixedNum([MNum.Elem(Frac(0, 1 + i % 11, 1 + i % 5), measures[i]) for i in range(count // 2, count + count // 2)])
+    report('MixedNum: compose, {count} + {count} measures'.format(count = count), best_time(lambda: left.compose(right), 20))
+    report('MixedNum: pack, {count} measures'.format(count = count),              best_time(left.pack, 20))
+    report('MixedNum: get_elem_by_measure, {count} measures'.format(count = count)
+           ,best_time(lambda: left.get_elem_by_measure(measures[count - 1]), 2000))
+
+def journal_sum(count = 2000):
+    """sum of journal lines: step-by-step compose against the builder"""
+    from mixedstr import MixedString as MStr
+    nums = [MStr.from_string(el) for el in journal_lines(count)]
+    def chain():
+        total = MNum.MixedNum()
+        for el in nums:
+            total = total.compose(el)
+        return total
+    def builder():
+        total = MNum.MixedNumBuilder()
+        for el in nums:
+            total.add_mixed(el)
+        return total.freeze()
+    report('MixedNum: compose chain, {count} lines'.format(count = count), best_time(chain, 5))
+    report('MixedNumBuilder: add_mixed, {count} lines'.format(count = count), best_time(builder, 5))
+    report('MixedNum: sum, {count} lines'.format(count = count), best_time(lambda: MNum.MixedNum.sum(nums), 5))
+
+def journal_batch(count = 10000):
+    """the same operations over many mixed numbers: columnar array (numpy) against the loop over MixedNum"""
+    try:
+        from mixedarray import MixedNumArray
+    except ImportError:
+        print('MixedNumArray: numpy is not installed')
+        return
+    from mixedstr import MixedString as MStr
+    nums = [MStr.from_string(el) for el in journal_lines(count)]
+    fee = MStr.from_string('1.1/2 hour; 3 foot')
+    factor = Frac(0, 3, 4)
+    converter = MNum.Converter()
+    for source, target, rate in (('hour', 'min', 60), ('min', 'sec', 60), ('yard', 'foot', 3), ('foot', 'inch', 12)):
+        converter.add_rate(source, target, Frac(1), Frac(rate))
+    measures = [MStr.measure_from_string(el) for el in ('min', 'inch')]
+    arr = MixedNumArray(nums)
+    report('MixedNumArray: from {count} MixedNum'.format(count = count), best_time(lambda: MixedNumArray(nums), 3))
+    for title, loop, batch in (
+        ('compose',    lambda: [el.compose(fee) for el in nums],                        lambda: arr.compose(fee))
+        ,('scale',    lambda: [el.with_rationals(Frac.mul, factor) for el in nums],   lambda: arr.scale(factor))
+        ,('pack',     lambda: [el.pack() for el in nums],                             lambda: arr.pack())
+        ,('convert',  lambda: [converter.convert_to_lowest_join(el, measures) for el in nums]
+                     ,lambda: arr.convert(converter, measures))
+    ):
+        report('MixedNum: loop {title}, {count} numbers'.format(title = title, count = count), best_time(loop, 3))
+        report('MixedNumArray: {title}, {count} numbers'.format(title = title, count = count), best_time(batch, 3))
+    report('MixedNumArray: rows, {count} numbers'.format(count = count), best_time(arr.rows, 3))
+
+def mixed_normalize(count = 10000):
+    """normalization of results: three passes (mixed, reduce, pack) against the fused normalize"""
+    from mixedstr import MixedString as MStr
+    nums = [MStr.from_string(el).with_rationals(Frac.simple) for el in journal_lines(count)]
+    report('MixedNum: mixed + reduce + pack, {count} numbers'.format(count = count)
+           ,best_time(lambda: [el.with_rationals(Frac.mixed).with_rationals(Frac.reduce).pack() for el in nums], 3))
+    report('MixedNum: normalize, {count} numbers'.format(count = count)
+           ,best_time(lambda: [el.normalize() for el in nums], 3))
+
+def mixed_pow():
+    """powers of multi-part numbers: repeated multiplication against repeated squaring"""
+    from mixedstr import MixedString as MStr
+    for strNum, exponent in (('6 foot; 6 inch', 3), ('1 yard; 2 foot; 3 inch', 5), ('1 hour; 30 min; 15 sec', 8)):
+        num = MStr.from_string(strNum)
+        def repeated():
+            result = num
+            for i in range(exponent - 1):
+                result = result.mul(num)
+            return result.fold_measures()
+        report('MixedNum: mul x{exponent}, {count} parts'.format(exponent = exponent, count = len(num.list))
+               ,best_time(repeated, 5))
+        report('MixedNum: pow({exponent}), {count} parts'.format(exponent = exponent, count = len(num.list))
+               ,best_time(lambda: num.pow(exponent), 5))
+
+def converter_load(count = 2000):
+    """loading of a chain of unit rates (every rate joins a new unit to the set) and the rate lookups"""
+    from random import Random
+    rnd = Random(1)
+    rows = [('u' + str(idx), 'u' + str(idx + 1), Frac(1), Frac(rnd.randint(2, 12))) for idx in range(count)]
+    pairs = [('u' + str(rnd.randrange(count)), 'u' + str(rnd.randrange(count))) for _ in range(count)]
+    def load():
+        converter = MNum.Converter()
+        for source, target, multiplicity, rate in rows:
+            converter.add_rate(source, target, multiplicity, rate)
+        return converter
+    report('Converter: add_rate, chain of {count} units'.format(count = count)
+           ,best_time(load, 1, 3))
+    converter = load()
+    report('Converter: get_unit_rate, {count} pairs'.format(count = count)
+           ,best_time(lambda: [converter.get_unit_rate(source, target) for source, target in pairs], 1, 3))
+
+def journal_lines(count):
+    """lines of a journal: a small set of unit strings reused many times"""
+    units = ('hour', 'min', 'sec', 'yard/min', 'dozen*mile', 'foot', 'inch:3', 'кг*м/с:2')
+    return [
+        '{a} {u1}; {b}.{c}/7 {u2}; -{c} {u3}'.format(
+            a = i, b = i % 13, c = 1 + i % 5
+            ,u1 = units[i % len(units)], u2 = units[(i + 3) % len(units)], u3 = units[(i + 5) % len(units)]
+        )
+        for i in range(count)
+    ]
+
+def journal_ingest(count = 5000):
+    """parsing and formatting of journal lines, measure caches"""
+    from mixedstr import MixedString as MStr
+    lines = journal_lines(count)
+    MStr.get_format().cache_clear()
+    report('MixedString: from_string, {count} lines'.format(count = count)
+           ,best_time(lambda: [MStr.from_string(el) for el in lines], 5))
+    nums = [MStr.from_string(el) for el in lines]
+    report('MixedString: to_string, {count} lines'.format(count = count)
+           ,best_time(lambda: [MStr.to_string(el) for el in nums], 5))
+    for name, info in MStr.cache_info().items():
+        print('    {name:<44} hits {hits}, misses {misses}'.format(name = name, hits = info.hits, misses = info.misses))
+
+def mixed_parse(count = 2000, fields = 20):
+    """one-pass parsing of long lines, rejection of incorrect lines"""
+    from mixedstr import MixedString as MStr
+    units = ('hour', 'min', 'sec', 'yard/min', 'dozen*mile', 'foot', 'inch:3', 'кг*м/с:2')
+    lines = [
+        '; '.join(['{neg}{i}.{n}/{d} {u}'.format(neg = '-' if j % 2 else '', i = i, n = j % 7, d = 7 + j % 13, u = units[j % len(units)])
+                   for j in range(fields)])
+        for i in range(count // fields)
+    ]
+    bad = [el + '; 1.2/0 m' if i % 2 else el + '; 2 kg*12:x' for i, el in enumerate(lines)]
+    report('MixedString: from_string, {count} fields'.format(count = count)
+           ,best_time(lambda: [MStr.from_string(el) for el in lines], 5))
+    report('MixedString: parse_many, {count} bad lines'.format(count = len(bad))
+           ,best_time(lambda: MStr.get_format().parse_many(bad), 5))
+
+def journal_export(count = 20000):
+    """formatting of many results into a text buffer"""
+    from io import StringIO
+    from mixedstr import MixedString as MStr
+    nums = [MStr.from_string(el) for el in journal_lines(count)]
+    def by_lines():
+        stream = StringIO()
+        for el in nums:
+            stream.write(MStr.to_string(el) + '\n')
+        return stream.getvalue()
+    def by_write_many():
+        stream = StringIO()
+        MStr.write_many(nums, stream)
+        return stream.getvalue()
+    assert by_lines() == by_write_many()
+    report('MixedString: to_string per line, {count} lines'.format(count = count), best_time(by_lines, 5))
+    report('MixedString: write_many, {count} lines'.format(count = count),         best_time(by_write_many, 5))
+
+def journal_binary(count = 20000):
+    """binary format against the text format and pickle: size and speed"""
+    from io import StringIO, BytesIO
+    import pickle
+    import mixedbin
+    from mixedstr import MixedString as MStr
+    nums = [MStr.from_string(el) for el in journal_lines(count)]
+    text = StringIO()
+    MStr.write_many(nums, text)
+    text = text.getvalue()
+    binary = BytesIO()
+    mixedbin.dump_iter(nums, binary)
+    binary = binary.getvalue()
+    pickled = pickle.dumps(nums)
+    for title, size in (('text', len(text.encode('utf-8'))), ('binary', len(binary)), ('pickle', len(pickled))):
+        print('{title:<48} {size:>12} bytes'.format(title = 'MixedNum: {count} as {name}'.format(count = count, name = title), size = size))
+    report('MixedString: write_many, {count}'.format(count = count), best_time(lambda: MStr.write_many(nums, StringIO()), 3))
+    report('mixedbin: dump_iter, {count}'.format(count = count),     best_time(lambda: mixedbin.dump_iter(nums, BytesIO()), 3))
+    report('pickle: dumps, {count}'.format(count = count),           best_time(lambda: pickle.dumps(nums), 3))
+    report('MixedString: from_string, {count}'.format(count = count)
+           ,best_time(lambda: [MStr.from_string(el) for el in text.splitlines()], 3))
+    report('mixedbin: load_iter, {count}'.format(count = count),     best_time(lambda: list(mixedbin.load_iter(BytesIO(binary))), 3))
+    report('pickle: loads, {count}'.format(count = count),           best_time(lambda: pickle.loads(pickled), 3))
+
+# ==========]MIXED
+
+benchmarks = {
+    'rational_memory'    : rational_memory
+    ,'rational_ops'      : rational_ops
+    ,'rational_big'      : rational_big
+    ,'rational_compare'  : rational_compare
+    ,'rational_sum'      : rational_sum
+    ,'rational_bounded'  : rational_bounded
+    ,'rational_array'    : rational_array
+    ,'rational_decimal'  : rational_decimal
+    ,'rational_interop'  : rational_interop
+    ,'ratio_parse'       : ratio_parse
+    ,'mixed_duplicates'  : mixed_duplicates
+    ,'mixed_memory'      : mixed_memory
+    ,'mixed_chain'       : mixed_chain
+    ,'mixed_compose'     : mixed_compose
+    ,'journal_ingest'    : journal_ingest
+    ,'mixed_parse'       : mixed_parse
+    ,'journal_export'    : journal_export
+    ,'journal_binary'    : journal_binary
+    ,'journal_sum'       : journal_sum
+    ,'journal_batch'     : journal_batch
+    ,'mixed_normalize'   : mixed_normalize
+    ,'mixed_pow'         : mixed_pow
+    ,'converter_load'    : converter_load
+}
+
+if __name__ == '__main__':
+    for name in (sysArgv[1:] or benchmarks.keys()):
+        benchmarks[name]()
@@ -63,11 +63,23 @@ class main:
         
         return True            
 
-    def show_decimal(self, pars = None):
+    def show_decimal(self, pars = ''):
         """Показывает в десятичном виде числовые значения элементов смешанного числа в регистре
 Само значение регистра не изменяется.
+Если параметром указано количество знаков после запятой, значения выводятся точно
+(с округлением до этого количества знаков или в периодической записи, например 0.1(6), если период умещается в эти знаки).
 
 """
+        pars = pars.strip() if pars else ''
+        if pars:
+            try:
+                digits = int(pars)
+                print(MStr.to_decimal_string(self.__register, digits, period = True))
+            except ValueError:
+                print('Количество знаков должно быть целым неотрицательным числом: ', pars)
+                return False
+            return True
+
         outList = []
         for elem in self.__register.list:
             outList.append('{dec}{msr}'.format(
@@ -82,6 +94,8 @@ class main:
 
         self.__register  = MNum.MixedNum() #put Zero in current register
         self.__archReg   = MNum.MixedNum() #put Zero in 'archive' register
+        self.__sumBuilder  = None # накопитель сложения/вычитания (см. evaluate)
+        self.__sumRegister = None # значение регистра, полученное из накопителя
         self.__converter = MNum.Converter()
 
     def disclose(self, mNum):
@@ -189,6 +203,31 @@ class main:
         self.__register = self.normalize(self.__register)
         self.show_output()
 
+    def set_precision(self, pars = ''):
+        """Устанавливает точность: наибольший знаменатель дробей в результатах вычислений
+(дроби заменяются наилучшими приближениями, что ускоряет длинные цепочки вычислений).
+Без параметра восстанавливает точные вычисления.
+
+"""
+        pars = pars.strip()
+        if not pars:
+            self.__maxDen = None
+            print('Точные вычисления')
+            return True
+        try:
+            maxDen = int(pars)
+        except ValueError:
+            maxDen = None
+        if not maxDen or maxDen < 1:
+            print('Наибольший знаменатель должен быть целым положительным числом: ', pars)
+            return False
+        # приближаются только результаты в регистре,
+        # курсы конвертера и промежуточные вычисления остаются точными
+        self.__maxDen = maxDen
+        self.__register = self.normalize(self.__register)
+        self.show_output()
+        return True
+
     def invert(self, pars = None):
         self.__register = self.__register.reciprocal()
         self.__register = self.normalize(self.__register)
@@ -237,12 +276,17 @@ class main:
         if op == '=':
             self.__register = mInp
         
-        elif op == '+':
-            # СЛОЖЕНИЕ
-            self.__register = self.__register.compose(mInp)
-        elif op == '-':
-            # ВЫЧИТАНИЕ
-            self.__register = self.__register.compose(mInp.with_rationals(Frac.opposite))
+        elif op == '+' or op == '-':
+            # СЛОЖЕНИЕ и ВЫЧИТАНИЕ
+            # накопитель используется повторно, пока регистр - его результат
+            # (иначе он заново создается из регистра)
+            if self.__sumBuilder == None or self.__sumRegister is not self.__register:
+                self.__sumBuilder = MNum.MixedNumBuilder(self.__register.list)
+            if op == '+':
+                self.__sumBuilder.add_mixed(mInp)
+            else:
+                self.__sumBuilder.sub_mixed(mInp)
+            self.__register = self.__sumBuilder.freeze()
         elif op == '*':
             # УМНОЖЕНИЕ
             if isRegular(mInp):
@@ -303,12 +347,21 @@ class main:
             return False
 
         self.__register = self.normalize(self.__register)
+        if op == '+' or op == '-':
+            if len(self.__register.list) == len(self.__sumBuilder):
+                self.__sumRegister = self.__register
+            else:
+                # нулевые элементы отброшены нормализацией,
+                # накопитель больше не соответствует регистру
+                self.__sumBuilder = None
         self.show_output(op,mInp)
         return True
 
     def normalize(self, mNum):
-        """приводит число в более удобный вид"""
-        return(mNum.with_rationals(Frac.mixed).with_rationals(Frac.reduce).pack())
+        """приводит число в более удобный вид (и к установленной точности, см. set_precision)"""
+        if self.__maxDen != None:
+            mNum = mNum.limit_denominator(self.__maxDen)
+        return(mNum.normalize())
 
     def show_output(self, op = '=>', opnd = None):
         """общий формат вывода после вычисления"""
@@ -403,8 +456,8 @@ Multiplicity;   Source;             Rate;           Target;
                 if not self.__converter.add_rate(
                         row['Source']
                         ,row['Target']
-                        ,MStr.from_string(row['Multiplicity']).rationals()[0]
-                        ,MStr.from_string(row['Rate']).rationals()[0]
+                        ,MStr.ratio_from_string(row['Multiplicity'])[0]
+                        ,MStr.ratio_from_string(row['Rate'])[0]
                     ):
                     print('WARNING ', row['Source'],', ', row['Target'])
             except ValueError as err:
@@ -418,6 +471,7 @@ Multiplicity;   Source;             Rate;           Target;
 
     def __init__(self):
         self.__sprFld = ', '
+        self.__maxDen = None # наибольший знаменатель результатов (None - точные вычисления)
 
         self.__batch = None
 
@@ -434,6 +488,7 @@ Multiplicity;   Source;             Rate;           Target;
             ,'FOLD'    : self.fold_measures
             ,'UNIFY'   : self.unify_measures
             ,'INVERT'  : self.invert
+            ,'PRECISION' : self.set_precision
 
             ,'RATETAB':self.show_rates
             ,'UNITS'  :self.show_units
@@ -466,6 +521,8 @@ Multiplicity;   Source;             Rate;           Target;
             ,'ИНВ'    : 'INVERT'
             ,'FOLD'   : 'FOLD'
             ,'ФОЛД'   : 'FOLD'
+            ,'PREC'   : 'PRECISION'
+            ,'ТОЧН'   : 'PRECISION'
 
 
 
@@ -0,0 +1,297 @@
+# Any copyright is dedicated to the Public Domain.
+# https://creativecommons.org/publicdomain/zero/1.0/
+# ===================== OR =========================
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+# Версия 2023-03-02
+
+"""Arrays of mixed numbers (columnar batch arithmetic, requires numpy)"""
+
+import numpy as np
+
+from rationals import Rational as Frac
+from rationalarray import RationalArray
+from mixednum import MixedNum, Elem
+
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+def _column(values):
+    """int64 array if the values fit, else array of python ints"""
+    if max(map(abs, values), default = 0) <= _INT64_MAX:
+        return np.array(values, dtype = np.int64)
+    return np.array(values, dtype = object)
+
+class _MeasureTable:
+
+    """Measures of the arrays and their IDs (positions in the table); the table only grows,
+    so it is shared by the arrays derived from each other.
+
+    Measures are kept as written (m*m and m:2 have different IDs),
+    equal measures share the canonical ID (see canonical), the elements are merged by it.
+
+    """
+
+    __slots__ = ('__measures', '__ids', '__known', '__canonIds', '__canon', '__canonArray')
+
+    def __init__(self):
+        self.__measures = []
+        self.__ids      = {} # (name, exponent) of the parts: ID
+        self.__known    = {} # id of the measure: (measure, ID), the same measure object is usually shared
+        self.__canonIds = {} # measure: canonical ID
+        self.__canon    = [] # ID: canonical ID
+        self.__canonArray = np.zeros(0, dtype = np.int64)
+
+    def __len__(self):
+        return(len(self.__measures))
+
+    def id(self, measure) -> int:
+        known = self.__known.get(id(measure))
+        if known != None and known[0] is measure:
+            return known[1]
+        key = tuple([(part.name, part.exponent) for part in measure.list])
+        msrId = self.__ids.get(key)
+        if msrId == None:
+            msrId = len(self.__measures)
+            self.__measures.append(measure)
+            self.__ids[key] = msrId
+            self.__canon.append(self.__canonIds.setdefault(measure, len(self.__canonIds)))
+        # the measure is kept here, so its id is not reused
+        self.__known[id(measure)] = (measure, msrId)
+        return msrId
+
+    def measure(self, msrId):
+        return(self.__measures[msrId])
+
+    @property
+    def canonCount(self):
+        """number of the canonical IDs"""
+        return(len(self.__canonIds))
+
+    def canonical(self):
+        """array of the canonical IDs by the IDs of the measures"""
+        if len(self.__canonArray) != len(self.__canon):
+            self.__canonArray = np.array(self.__canon, dtype = np.int64)
+        return(self.__canonArray)
+
+class MixedNumArray:
+
+    """Batch of mixed numbers stored by columns: row (number of the mixed number in the batch),
+    measure ID, numerator, denominator (the fractions are RationalArray).
+
+    Elements are ordered by rows, and inside a row as in MixedNum;
+    every operation applies to all the rows at once.
+    The rows are given as ordinary MixedNum (see row, rows); the fractions are in the simple notation,
+    or in the mixed notation after normalize. Measures keep their spelling as in MixedNum
+    (the sum of m*m and m:2 has the measure of the first of them).
+
+    """
+
+    __slots__ = ('__count', '__rows', '__msrs', '__fracs', '__table', '__mixed', '__starts')
+
+    def __init__(self, mixNums = ()):
+        table = _MeasureTable()
+        rows  = []
+        msrs  = []
+        nums  = []
+        dens  = []
+        count = 0
+        for mixNum in mixNums:
+            for el in mixNum.list:
+                num, den = el.rational.ratio()
+                rows.append(count)
+                msrs.append(table.id(el.measure))
+                nums.append(num)
+                dens.append(den)
+            count += 1
+        self.__set(
+            count, table
+            ,np.array(rows, dtype = np.int64), np.array(msrs, dtype = np.int64)
+            ,RationalArray.from_parts(_column(nums), _column(dens))
+        )
+
+    def __set(self, count, table, rows, msrs, fracs, mixed = False):
+        self.__count  = count
+        self.__table  = table
+        self.__rows   = rows
+        self.__msrs   = msrs
+        self.__fracs  = fracs
+        self.__mixed  = mixed
+        self.__starts = np.searchsorted(rows, np.arange(count + 1))
+
+    @staticmethod
+    def __make(count, table, rows, msrs, fracs, mixed = False):
+        """trusted constructor for the results of own operations (elements are ordered and merged)"""
+        arr = MixedNumArray.__new__(MixedNumArray)
+        arr.__set(count, table, rows, msrs, fracs, mixed)
+        return arr
+
+    @staticmethod
+    def __merge(count, table, rows, msrs, nums, dens):
+        """ordered elements (by rows, then by the order of the input) with the summation of the equal-measure elements of a row;
+the element of the sum takes the place (and the measure as written) of the first of them
+
+        """
+        key = rows * max(table.canonCount, 1) + table.canonical()[msrs]
+        uniq, first, inverse = np.unique(key, return_index = True, return_inverse = True)
+        if len(uniq) == len(key):
+            return MixedNumArray.__make(count, table, rows, msrs, RationalArray.from_parts(nums, dens))
+
+        # common denominators of the groups are not greater than the product of the denominators
+        groupSize = int(np.bincount(inverse).max())
+        maxDen = int(np.abs(dens).max())
+        if (
+            nums.dtype == object
+            or dens.dtype == object
+            or maxDen ** groupSize * max(int(np.abs(nums).max()), 1) * groupSize > _INT64_MAX
+        ):
+            # sums with python ints
+            nums = nums.astype(object)
+            dens = dens.astype(object)
+        lcm_ = np.ones(len(uniq), dtype = dens.dtype)
+        np.lcm.at(lcm_, inverse, dens)
+        sums = np.zeros(len(uniq), dtype = nums.dtype)
+        np.add.at(sums, inverse, nums * (lcm_[inverse] // dens))
+
+        order = np.argsort(first, kind = 'stable')
+        first = first[order]
+        return MixedNumArray.__make(
+            count, table, rows[first], msrs[first]
+            ,RationalArray.from_parts(sums[order], lcm_[order])
+        )
+
+    def __len__(self):
+        return(self.__count)
+
+    def __getitem__(self, idx):
+        return(self.row(idx))
+
+    @property
+    def size(self):
+        """number of elements of all the rows"""
+        return(len(self.__rows))
+
+    def row(self, idx):
+        """mixed number of the row"""
+        if idx < 0:
+            idx += self.__count
+        if not 0 <= idx < self.__count:
+            raise IndexError('row index out of range')
+        outList = []
+        for pos in range(self.__starts[idx], self.__starts[idx + 1]):
+            frac = Frac.shorter(int(self.__fracs.numerators[pos]), int(self.__fracs.denominators[pos]))
+            outList.append(Elem(frac.mixed() if self.__mixed else frac, self.__table.measure(self.__msrs[pos])))
+        return(MixedNum(outList))
+
+    def rows(self):
+        """list of MixedNum"""
+        return [self.row(idx) for idx in range(self.__count)]
+
+    def __operand(self, other):
+        """(rows, measure IDs, numerators, denominators) of the elements to compose with:
+other is MixedNumArray with the same number of rows or MixedNum (added to every row)
+
+        """
+        if isinstance(other, MixedNumArray):
+            if len(other) != self.__count:
+                raise ValueError('mixed number arrays must have the same number of rows')
+            rows = other.__rows
+            msrIds = other.__msrs
+            if other.__table is not self.__table:
+                # measure IDs of other are replaced with IDs of the own table
+                remap = np.array([self.__table.id(other.__table.measure(el)) for el in range(len(other.__table))], dtype = np.int64)
+                msrIds = remap[msrIds] if len(msrIds) else msrIds
+            return (rows, msrIds, other.__fracs.numerators, other.__fracs.denominators)
+        if isinstance(other, MixedNum):
+            width = len(other.list)
+            rows = np.repeat(np.arange(self.__count, dtype = np.int64), width)
+            msrIds = np.tile(np.array([self.__table.id(el.measure) for el in other.list], dtype = np.int64), self.__count)
+            ratios = [el.rational.ratio() for el in other.list]
+            nums = np.tile(_column([el[0] for el in ratios]), self.__count)
+            dens = np.tile(_column([el[1] for el in ratios]), self.__count)
+            return (rows, msrIds, nums, dens)
+        raise ValueError('incorrect operand of mixed number array')
+
+    @staticmethod
+    def __concat(left, right):
+        """numpy can not mix int64 with python ints"""
+        if left.dtype == object or right.dtype == object:
+            return np.concatenate((left.astype(object), right.astype(object)))
+        return np.concatenate((left, right))
+
+    def compose(self, other):
+        """row-wise union with the summation of the same-measure elements (see MixedNum.compose)"""
+        oRows, oMsrs, oNums, oDens = self.__operand(other)
+        rows = np.concatenate((self.__rows, oRows))
+        # the elements of other go after the elements of self in every row
+        order = np.argsort(rows, kind = 'stable')
+        return MixedNumArray.__merge(
+            self.__count, self.__table, rows[order]
+            ,np.concatenate((self.__msrs, oMsrs))[order]
+            ,MixedNumArray.__concat(self.__fracs.numerators, oNums)[order]
+            ,MixedNumArray.__concat(self.__fracs.denominators, oDens)[order]
+        )
+
+    def scale(self, multiplier):
+        """multiplication of all the fractions by a number: Rational, int or fractions.Fraction (see MixedNum.with_rationals)"""
+        return MixedNumArray.__make(self.__count, self.__table, self.__rows, self.__msrs, self.__fracs.mul(multiplier))
+
+    def pack(self):
+        """remove zero-elements"""
+        mask = ~self.__fracs.isZero()
+        return MixedNumArray.__make(
+            self.__count, self.__table, self.__rows[mask], self.__msrs[mask]
+            ,RationalArray.from_parts(self.__fracs.numerators[mask], self.__fracs.denominators[mask])
+            ,self.__mixed
+        )
+
+    def normalize(self):
+        """fractions in the mixed notation (they are always reduced), without zero-elements"""
+        packed = self.pack()
+        packed.__mixed = True
+        return packed
+
+    def convert(self, converter, measures):
+        """every element is converted to the smallest of the requested measures that it can be converted to
+(as Converter.convert_to_lowest_join): the converted elements go first in every row, then the rest.
+The integer parts are not distributed between several requested measures (see Converter.convert).
+
+        """
+        # divisors are found once for every measure of the table
+        targets = []
+        divNums = []
+        divDens = []
+        for msrId in range(len(self.__table)):
+            divisor = None
+            chosenMsr = None
+            for inMsr in measures:
+                opDiv = converter.get_measure_rate(self.__table.measure(msrId), inMsr)
+                if opDiv and (divisor == None or opDiv < divisor):
+                    divisor = opDiv
+                    chosenMsr = inMsr
+            if divisor == None:
+                targets.append(-1)
+                divNums.append(1)
+                divDens.append(1)
+            else:
+                targets.append(self.__table.id(chosenMsr))
+                num, den = divisor.ratio()
+                divNums.append(num)
+                divDens.append(den)
+
+        targets = np.array(targets, dtype = np.int64)[self.__msrs]
+        converted = targets >= 0
+        fracs = self.__fracs.div(
+            RationalArray.from_parts(
+                _column(divNums)[self.__msrs]
+                ,_column(divDens)[self.__msrs]
+            )
+        )
+        msrs = np.where(converted, targets, self.__msrs)
+        # converted elements first, the order inside the groups is kept
+        order = np.lexsort((np.arange(len(msrs)), ~converted, self.__rows))
+        return MixedNumArray.__merge(
+            self.__count, self.__table, self.__rows[order], msrs[order]
+            ,fracs.numerators[order], fracs.denominators[order]
+        )
@@ -0,0 +1,284 @@
+# Any copyright is dedicated to the Public Domain.
+# https://creativecommons.org/publicdomain/zero/1.0/
+# ===================== OR =========================
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+# Версия 2023-03-02
+
+"""Compact binary format of Rational, Measure and MixedNum
+
+Data starts with the header: signature b'MXN' and the version byte,
+then records follow, every record is its length (varint) and its body.
+Body is the type tag (b'R', b'M', b'N') and the value:
+
+    Rational  zigzag varint numerator, varint (denominator * 2 + whole flag)
+    Measure   measure reference
+    MixedNum  varint count of elements, elements: Rational, measure reference
+
+Measures and unit names are kept in the tables shared by all records of the data,
+so a repeated measure is a single varint:
+measure reference is the index in the table of measures; the index equal to the size of the table
+defines a new measure, it is followed by the varint count of parts,
+parts: name reference, zigzag varint exponent.
+Name reference is the index in the table of names; the index equal to the size of the table
+defines a new name, it is followed by the length and the UTF-8 bytes of the name.
+
+"""
+
+from rationals import Rational as Frac
+from mixednum import MixedNum, Elem, MsrPart, Measure
+
+SIGNATURE = b'MXN'
+VERSION   = 2
+
+_HEADER = SIGNATURE + bytes((VERSION,))
+
+_TAG_RATIONAL = ord('R')
+_TAG_MEASURE  = ord('M')
+_TAG_MIXED    = ord('N')
+
+def _write_varint(out, value):
+    """unsigned int to out (bytearray): 7 bits per byte, the high bit means continuation"""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _write_signed(out, value):
+    """signed int as zigzag varint: 0, -1, 1, -2, ... -> 0, 1, 2, 3, ..."""
+    _write_varint(out, value << 1 if value >= 0 else ((-value) << 1) - 1)
+
+def _read_varint(data, pos):
+    """returns tuple (value, position after the value)"""
+    value = 0
+    shift = 0
+    while True:
+        try:
+            byte = data[pos]
+        except IndexError:
+            raise ValueError('incorrect binary data: unexpected end')
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return (value, pos)
+        shift += 7
+
+def _read_signed(data, pos):
+    value, pos = _read_varint(data, pos)
+    return ((-((value + 1) >> 1) if value & 1 else value >> 1), pos)
+
+class _Encoder:
+
+    """Writer of record bodies with the tables of measures and unit names"""
+
+    __slots__ = ('__names', '__measures', '__known')
+
+    def __init__(self):
+        self.__names = {}
+        # measures are kept as written (equal measures may have different parts, m*m and m:2)
+        self.__measures = {} # (name, exponent) of the parts: index
+        self.__known = {}    # id of the measure: (measure, index), the same measure object is usually shared
+
+    def record(self, value):
+        """length-prefixed record of the value"""
+        body = bytearray()
+        if isinstance(value, MixedNum):
+            body.append(_TAG_MIXED)
+            _write_varint(body, len(value.list))
+            for elem in value.list:
+                self.__rational(body, elem.rational)
+                self.__measure(body, elem.measure)
+        elif isinstance(value, Measure):
+            body.append(_TAG_MEASURE)
+            self.__measure(body, value)
+        elif isinstance(value, Frac):
+            body.append(_TAG_RATIONAL)
+            self.__rational(body, value)
+        else:
+            raise ValueError('value must be Rational, Measure or MixedNum')
+        out = bytearray()
+        _write_varint(out, len(body))
+        out += body
+        return out
+
+    @staticmethod
+    def __rational(out, frac):
+        num, den = frac.ratio()
+        _write_signed(out, num)
+        # integer part shown (mixed notation) is the lowest bit
+        _write_varint(out, den << 1 | (frac.intPart != 0))
+
+    def __measure(self, out, measure):
+        known = self.__known.get(id(measure))
+        if known != None and known[0] is measure:
+            _write_varint(out, known[1])
+            return
+        key = tuple([(part.name, part.exponent) for part in measure.list])
+        idx = self.__measures.get(key)
+        # the measure is kept in the table, so its id is not reused
+        self.__known[id(measure)] = (measure, idx if idx != None else len(self.__measures))
+        if idx != None:
+            _write_varint(out, idx)
+            return
+        idx = len(self.__measures)
+        self.__measures[key] = idx
+        _write_varint(out, idx)
+        _write_varint(out, len(measure.list))
+        for part in measure.list:
+            idx = self.__names.get(part.name)
+            if idx == None:
+                idx = len(self.__names)
+                self.__names[part.name] = idx
+                _write_varint(out, idx)
+                name = part.name.encode('utf-8')
+                _write_varint(out, len(name))
+                out += name
+            else:
+                _write_varint(out, idx)
+            _write_signed(out, part.exponent)
+
+class _Decoder:
+
+    """Reader of record bodies with the tables of measures and unit names"""
+
+    __slots__ = ('__names', '__measures')
+
+    def __init__(self):
+        self.__names = []
+        self.__measures = []
+
+    def record(self, data, pos, end):
+        """value of the record body data[pos:end]"""
+        if pos >= end:
+            raise ValueError('incorrect binary data: empty record')
+        try:
+            tag = data[pos]
+            pos += 1
+            if tag == _TAG_MIXED:
+                count, pos = _read_varint(data, pos)
+                measures = self.__measures
+                elems = []
+                for _ in range(count):
+                    frac, pos = _Decoder.__rational(data, pos)
+                    # single-byte references are the usual case (the table of measures is small)
+                    idx = data[pos]
+                    if idx < 0x80 and idx < len(measures):
+                        pos += 1
+                        measure = measures[idx]
+                    else:
+                        measure, pos = self.__measure(data, pos)
+                    elems.append(Elem(frac, measure))
+                value = MixedNum(elems)
+            elif tag == _TAG_MEASURE:
+                value, pos = self.__measure(data, pos)
+            elif tag == _TAG_RATIONAL:
+                value, pos = _Decoder.__rational(data, pos)
+            else:
+                raise ValueError('incorrect binary data: unknown type of record')
+        except IndexError:
+            raise ValueError('incorrect binary data: unexpected end')
+        if pos != end:
+            raise ValueError('incorrect binary data: wrong length of record')
+        return value
+
+    @staticmethod
+    def __rational(data, pos):
+        # varints are read inline when they are single bytes
+        num = data[pos]
+        if num < 0x80:
+            pos += 1
+        else:
+            num, pos = _read_varint(data, pos)
+        num = -((num + 1) >> 1) if num & 1 else num >> 1
+        den = data[pos]
+        if den < 0x80:
+            pos += 1
+        else:
+            den, pos = _read_varint(data, pos)
+        return (Frac.shorter(num, den >> 1, bool(den & 1)), pos)
+
+    def __measure(self, data, pos):
+        idx, pos = _read_varint(data, pos)
+        if idx < len(self.__measures):
+            return (self.__measures[idx], pos)
+        if idx > len(self.__measures):
+            raise ValueError('incorrect binary data: unknown measure')
+        count, pos = _read_varint(data, pos)
+        parts = []
+        for _ in range(count):
+            idx, pos = _read_varint(data, pos)
+            if idx == len(self.__names):
+                size, pos = _read_varint(data, pos)
+                self.__names.append(bytes(data[pos:pos + size]).decode('utf-8'))
+                pos += size
+            elif idx > len(self.__names):
+                raise ValueError('incorrect binary data: unknown unit name')
+            exponent, pos = _read_signed(data, pos)
+            parts.append(MsrPart(self.__names[idx], exponent))
+        measure = Measure(parts)
+        self.__measures.append(measure)
+        return (measure, pos)
+
+def _check_header(header):
+    if header[:len(SIGNATURE)] != SIGNATURE:
+        raise ValueError('incorrect binary data: no signature')
+    if len(header) < len(_HEADER) or header[len(SIGNATURE)] != VERSION:
+        raise ValueError('unsupported version of binary data')
+
+def dumps(value) -> bytes:
+    """binary form of Rational, Measure or MixedNum"""
+    return(_HEADER + _Encoder().record(value))
+
+def loads(data):
+    """value from its binary form (see dumps)"""
+    _check_header(data[:len(_HEADER)])
+    size, pos = _read_varint(data, len(_HEADER))
+    if pos + size != len(data):
+        raise ValueError('incorrect binary data: wrong length of record')
+    return(_Decoder().record(data, pos, pos + size))
+
+def dump_iter(values, stream, bufferSize = 65536):
+    """write many values to a binary stream; unit names are written once for all of them"""
+    encoder = _Encoder()
+    buffer = bytearray(_HEADER)
+    for value in values:
+        buffer += encoder.record(value)
+        if len(buffer) >= bufferSize:
+            stream.write(buffer)
+            buffer = bytearray()
+    if buffer:
+        stream.write(buffer)
+
+def load_iter(stream, bufferSize = 65536):
+    """generator of the values read from a binary stream (see dump_iter)"""
+    decoder = _Decoder()
+    data = bytearray()
+    pos = 0
+
+    def fill(need):
+        """read the stream until need bytes are available from pos, False at the end of stream"""
+        nonlocal data, pos
+        while len(data) - pos < need:
+            chunk = stream.read(bufferSize)
+            if not chunk:
+                return False
+            # the parsed part of the buffer is dropped
+            data = data[pos:] + chunk
+            pos = 0
+        return True
+
+    if not fill(len(_HEADER)):
+        raise ValueError('incorrect binary data: no header')
+    _check_header(data[:len(_HEADER)])
+    pos = len(_HEADER)
+    while fill(1):
+        # the length prefix is at most 10 bytes (records are much shorter than 2**70)
+        fill(10)
+        size, start = _read_varint(data, pos)
+        pos = start
+        if not fill(size):
+            raise ValueError('incorrect binary data: unexpected end')
+        yield decoder.record(data, pos, pos + size)
+        pos += size
@@ -5,7 +5,7 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-# Версия 2023-02-21
+# Версия 2023-03-03
 
 """Mixed Number arithmetic"""
 
@@ -14,11 +14,76 @@ here put the theory of a mixed numbers
 
 """
 
-from rationals import Rational as Frac
+from sys import intern as sys_intern
+from functools import lru_cache
+from collections.abc import Mapping, Sequence
+
+from rationals import Rational as Frac, RationalAccumulator
+
+class UnitRegistry:
+    """interned unit names: every distinct name of the existing parts gets a small integer ID
+
+    The registry counts the parts of every name (see MsrPart): the ID is released
+    when the last part of the name is deleted, and is reused for a new name.
+
+    """
+
+    __slots__ = ('__ids', '__names', '__counts', '__free')
+
+    def __init__(self):
+        self.__ids    = {}
+        self.__names  = []
+        self.__counts = []
+        self.__free   = []
+
+    def __len__(self):
+        return(len(self.__ids))
+
+    def id(self, name):
+        """ID of the registered name OR None"""
+        return(self.__ids.get(name))
+
+    def name(self, unitId) -> str:
+        return(self.__names[unitId])
+
+    def acquire(self, name) -> int:
+        """ID of the name for the new part of it"""
+        unitId = self.__ids.get(name)
+        if unitId == None:
+            name = sys_intern(name)
+            if self.__free:
+                unitId = self.__free.pop()
+                self.__names[unitId]  = name
+            else:
+                unitId = len(self.__names)
+                self.__names.append(name)
+                self.__counts.append(0)
+            self.__ids[name] = unitId
+        self.__counts[unitId] += 1
+        return unitId
+
+    def release(self, unitId):
+        """the part of the name is deleted"""
+        self.__counts[unitId] -= 1
+        if self.__counts[unitId] == 0:
+            del self.__ids[self.__names[unitId]]
+            self.__names[unitId] = None
+            self.__free.append(unitId)
+
+units = UnitRegistry()
 
 class MsrPart:
-    """the elementary part of combined measure: name and exponent"""
-    def __init__(self, name = '', exponent = 1):
+    """the elementary part of combined measure: name and exponent
+
+    Instances are flyweights: the recently used instances are shared (the cache is bounded),
+    so parts are compared by identity first, and the units by their IDs (see UnitRegistry).
+    The name is stripped.
+
+    """
+
+    __slots__ = ('__name', '__unitId', '__exponent')
+
+    def __new__(cls, name = '', exponent = 1):
         def is_correct(name, exponent):
             return(
                 isinstance(name, str)
@@ -27,77 +92,158 @@ class MsrPart:
             )
         if not is_correct(name, exponent):
             raise ValueError("incorrect part(s) of measure")
-            
-        self.__name = name.strip()
-        self.__exponent = exponent
-        
+
+        return(MsrPart.__shared(cls, name.strip(), exponent))
+
+    @staticmethod
+    @lru_cache(maxsize = 4096)
+    def __shared(cls, name, exponent):
+        part = object.__new__(cls)
+        part.__unitId   = units.acquire(name)
+        part.__name     = units.name(part.__unitId)
+        part.__exponent = exponent
+        return part
+
+    def __del__(self):
+        units.release(self.__unitId)
+
+    def __reduce__(self):
+        # copies and unpickled parts are the shared instances too (equal ones, if evicted from the cache)
+        return(MsrPart, (self.__name, self.__exponent))
 
     def __str__(self):
         return(str({'name':str(self.__name), 'exponent':str(self.__exponent)}))
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, MsrPart):
             return False
         return(
-            self.name == other.name
-            and self.exponent == other.exponent
+            self.__unitId == other.__unitId
+            and self.__exponent == other.__exponent
         )
 
+    def __hash__(self):
+        return(hash((self.__unitId, self.__exponent)))
+
     @property
     def name(self):
         return(self.__name)
 
+    @property
+    def unitId(self):
+        return(self.__unitId)
+
     @property
     def exponent(self):
         return(self.__exponent)
 
+def _key_of_parts(parts):
+    """sparse exponent vector of the parts: flat tuple (unitId, sign, exponent, ...) sorted by (unitId, sign),
+the same-unit exponents of the same sign are summed
+
+    """
+    sParts = {}
+    for part in parts:
+        sKey = (part.unitId, part.exponent > 0)
+        sParts[sKey] = sParts.get(sKey, 0) + part.exponent
+    return tuple([el for item in sorted(sParts.items()) for el in (*item[0], item[1])])
+
+def _merge_keys(left, right):
+    """sum of two sparse exponent vectors (see _key_of_parts): one pass over both"""
+    if not right:
+        return left
+    if not left:
+        return right
+    outList = []
+    lIdx = 0
+    rIdx = 0
+    while lIdx < len(left) and rIdx < len(right):
+        lKey = (left[lIdx],  left[lIdx + 1])
+        rKey = (right[rIdx], right[rIdx + 1])
+        if lKey < rKey:
+            outList.extend(left[lIdx:lIdx + 3])
+            lIdx += 3
+        elif rKey < lKey:
+            outList.extend(right[rIdx:rIdx + 3])
+            rIdx += 3
+        else:
+            # the same sign: the sum is never zero
+            outList.extend((*lKey, left[lIdx + 2] + right[rIdx + 2]))
+            lIdx += 3
+            rIdx += 3
+    outList.extend(left[lIdx:])
+    outList.extend(right[rIdx:])
+    return tuple(outList)
+
 class Measure:
-    """combined measure: list of elementary parts (MsrPart)"""
-    def __init__(self, inList = []):
-        self.__list = []
+    """combined measure: list of elementary parts (MsrPart)
+
+    Measure is immutable. Besides the list of parts (as entered, for the output)
+    it keeps the sparse exponent vector: sums of the same-unit exponents of the same sign, sorted by unit ID.
+    The vector is the canonical key (its hash is computed once), so measures are compared cheaply
+    and can be used as dict keys; combining measures merges their vectors,
+    negation negates the vector; the folded measure is computed once.
+
+    """
+
+    __slots__ = ('__list', '__key', '__hash', '__folded')
+
+    def __init__(self, inList = ()):
+        outList = []
         for el in inList:
             if not isinstance(el, MsrPart):
                 raise ValueError("incorrect measure's part")
             if el.name == '':
                 continue
+            # parts are shared (see MsrPart)
+            outList.append(el)
+        outList = tuple(outList)
+        self.__set(outList, _key_of_parts(outList))
+
+    def __set(self, parts, key):
+        self.__list   = parts
+        self.__key    = key
+        self.__hash   = hash(key)
+        self.__folded = None
+
+    @staticmethod
+    def __make(parts, key):
+        """trusted constructor for the results of own operations:
+parts is a tuple of non-empty MsrPart, key is their exponent vector
 
-            self.__list.append(MsrPart(el.name, el.exponent))
+        """
+        msr = Measure.__new__(Measure)
+        msr.__set(parts, key)
+        return msr
 
     def __str__(self):
         return(','.join([str(i) for i in self.__list]))
 
     def __eq__(self, other):
-        def sgn(expo):
-            return(expo > 0)
-        
+        # the same-name exponents of the same sign are summed:
+        # m*m equals m:2, but m/m does not equal the empty measure
+        if self is other:
+            return True
         if not isinstance(other, Measure):
             return False
+        return(self.__hash == other.__hash and self.__key == other.__key)
 
-        sParts = {}
-        for part in self.__list:
-            expo = sParts.get((part.name, sgn(part.exponent)))
-
-            if expo:
-                sParts[(part.name, sgn(expo))] = expo + part.exponent
-            else:
-                sParts[(part.name, sgn(part.exponent))] = part.exponent
-        
-        for part in other.__list:
-            if not (part.name,sgn(part.exponent)) in sParts:
-                return False
-            sParts[(part.name, sgn(part.exponent))] = sParts[(part.name, sgn(part.exponent))] - part.exponent
-
-        for part in sParts:
-            if sParts[part] != 0:
-                return False
-
-        return True
+    def __hash__(self):
+        return(self.__hash)
 
     def __neg__(self):
-        outList = []
-        for el in self.__list:
-            outList.append(MsrPart(el.name, -el.exponent))
-        return(Measure(outList))
+        key = self.__key
+        # the signs are inverted, so the order of the signs of one unit is inverted too
+        negKey = []
+        for idx in range(0, len(key), 3):
+            if idx + 3 < len(key) and key[idx + 3] == key[idx]:
+                # both signs of the unit: (unitId, False, -a, unitId, True, b) -> (unitId, False, -b, unitId, True, a)
+                negKey.extend((key[idx], False, -key[idx + 5], key[idx], True, -key[idx + 2]))
+            elif idx == 0 or key[idx - 3] != key[idx]:
+                negKey.extend((key[idx], not key[idx + 1], -key[idx + 2]))
+        return(Measure.__make(tuple([MsrPart(el.name, -el.exponent) for el in self.__list]), tuple(negKey)))
 
     @property
     def list(self):
@@ -105,35 +251,47 @@ class Measure:
 
     def combine(self, *others):
         """union lists of entering parts of measure"""
-        outList = []
-        outList.extend(self.__list)
+        outList = list(self.__list)
+        key = self.__key
         for el in others:
             outList.extend(el.list)
-        return(Measure(outList))
+            key = _merge_keys(key, el.__key)
+        return(Measure.__make(tuple(outList), key))
+
+    def mul(self, other, fold = False):
+        """product of measures: union of the parts (as combine), folded if fold is True;
+the folded products are cached by the parts of both measures
+
+        """
+        if not fold:
+            return(self.combine(other))
+        return(_folded_product(self.__list, other.__list))
 
     def fold(self):
         """
         summation of the same-name exponents, removing zeroes
         """
+        if self.__folded != None:
+            return self.__folded
 
-        def get_index(inList, inName):
-            for idx in range(len(inList)):
-                if inList[idx].name == inName:
-                    return idx
-            return None
-
-        outList = []
+        # unitId: exponent; the order of the units is kept:
+        # a new unit goes to the end, a unit with the zero sum is removed
+        exponents = {}
         for el in self.__list:
-            idx = get_index(outList, el.name)
-            if idx == None:
-                outList.append(MsrPart(el.name, el.exponent))
+            newExpo = exponents.get(el.unitId, 0) + el.exponent
+            if newExpo:
+                exponents[el.unitId] = newExpo
             else:
-                newExpo = el.exponent + outList[idx].exponent
-                if newExpo:
-                    outList[idx] = MsrPart(outList[idx].name, newExpo)
-                else:
-                    del outList[idx]
-        return(Measure(outList))
+                del exponents[el.unitId]
+        parts = tuple([MsrPart(units.name(unitId), expo) for unitId, expo in exponents.items()])
+        if parts == self.__list:
+            folded = self
+        else:
+            folded = Measure.__make(parts, _key_of_parts(parts))
+        # a folded measure is folded already
+        folded.__folded = folded
+        self.__folded = folded
+        return folded
 
     def isTrivial(self):
         """if the measure is trivial: it has only one part and the exponent 1"""
@@ -142,6 +300,11 @@ class Measure:
             and self.__list[0].exponent == 1
         )
 
+@lru_cache(maxsize = 4096)
+def _folded_product(leftParts, rightParts):
+    """see Measure.mul: the key is the parts (not the measures), because equal measures may be written differently"""
+    return(Measure(leftParts + rightParts).fold())
+
 class Elem:
     """the elementary part of a mixed number: a fraction having a measure"""
     def __init__(self, rational, measure = Measure()):
@@ -156,7 +319,8 @@ class Elem:
             raise ValueError("incorrect part(s) of mixed number element")
         
         self.__rational = rational
-        self.__measure = measure.combine()
+        # measure is immutable, so it is shared
+        self.__measure = measure
 
     def __str__(self):
         return(str({'rational':str(self.__rational), 'measure':str(self.__measure)}))
@@ -170,17 +334,43 @@ class Elem:
         return(self.__rational)
 
 class MixedNum:
-    """list of named fractions"""
+    """list of named fractions
+
+    The elements keep the order of the input; the index (measure: position in the list)
+    makes the search of the same-measure elements O(1), so construction and composition are linear.
+
+    """
+
+    __slots__ = ('__list', '__index')
+
     def __init__(self, inList = []):
-        self.__list = []
+        self.__list  = []
+        self.__index = {}
+        sums = [] # accumulators of the same-measure elements (by index), None if the element is single
         for el in inList:
             if not isinstance(el, Elem):
                 raise ValueError("incorrect element of mixed number")
-            idx = self.get_measure_index(el.measure)
+            idx = self.__index.get(el.measure)
             if idx == None:
-                self.__list.append(Elem(el.rational, el.measure))
+                self.__index[el.measure] = len(self.__list)
+                # elements are not changed, so they are shared
+                self.__list.append(el)
+                sums.append(None)
             else:
-                self.__list[idx] = Elem(self.__list[idx].rational.add(el.rational), self.__list[idx].measure)
+                if sums[idx] == None:
+                    sums[idx] = RationalAccumulator((self.__list[idx].rational,))
+                sums[idx].add(el.rational)
+        for idx in range(len(sums)):
+            if sums[idx] != None:
+                self.__list[idx] = Elem(sums[idx].value(), self.__list[idx].measure)
+
+    @staticmethod
+    def __make(elems):
+        """trusted constructor for the results of own operations: elems is a new list of elements with different measures"""
+        mixNum = MixedNum.__new__(MixedNum)
+        mixNum.__list  = elems
+        mixNum.__index = {el.measure: idx for idx, el in enumerate(elems)}
+        return mixNum
 
     def __str__(self):
         return(','.join([str(i) for i in self.__list]))
@@ -203,10 +393,7 @@ class MixedNum:
         return outList
 
     def get_measure_index(self, inMeasure):
-        for idx in range(len(self.__list)):
-            if self.__list[idx].measure == inMeasure:
-                return idx
-        return None
+        return(self.__index.get(inMeasure))
 
     def get_elem_by_measure(self, inMeasure):
         idx = self.get_measure_index(inMeasure)
@@ -241,20 +428,50 @@ class MixedNum:
                     ,-el.measure
                 )
             )
-        return(MixedNum(outList))
+        return(MixedNum.__make(outList))
 
-    def mul(self, other):
-        """Mx/Mx multiplication with convertions of measures"""
-        outList = []
+    def mul(self, other, fold = False):
+        """Mx/Mx multiplication with convertions of measures;
+if fold is True, the measures of the products are folded (as fold_measures, but without the unfolded intermediate number)
+
+        """
+        # по умолчанию единицы произведения не сворачиваются (принцип максимального сохранения ввода),
+        # свертка - по явному запросу
+        builder = MixedNumBuilder()
         for oEl in other.__list:
             for sEl in self.__list:
-                outList.append(
+                builder.add(
                     Elem(
                         oEl.rational.mul(sEl.rational)
-                        ,oEl.measure.combine(sEl.measure)
+                        ,oEl.measure.mul(sEl.measure, fold)
                     )
                 )
-        return(MixedNum(outList))
+        return(builder.freeze())
+
+    def pow(self, exponent):
+        """integer power: repeated squaring with the folding of the measures (see mul);
+the negative power is the power of the reciprocal, so it is defined for one-element numbers only
+
+        """
+        if type(exponent) is not int:
+            raise ValueError('exponent must be int')
+        if exponent == 0:
+            return(MixedNum((Elem(Frac(1)),)))
+        base = self
+        if exponent < 0:
+            if len(self.__list) != 1:
+                raise ValueError('negative power of mixed number with more than one element')
+            base = self.reciprocal()
+            exponent = -exponent
+
+        result = None
+        while True:
+            if exponent & 1:
+                result = base if result == None else result.mul(base, True)
+            exponent >>= 1
+            if not exponent:
+                return result
+            base = base.mul(base, True)
 
     def div(self, other, converter):
         """Mx/Mx division: shortcut for multiplication with preliminary conversion and check"""
@@ -272,11 +489,11 @@ class MixedNum:
 
     def pack(self):
         """remove zero-elements"""
-        outList = []
-        for el in self.__list:
-            if not el.rational.isZero():
-                outList.append(Elem(el.rational, el.measure))
-        return(MixedNum(outList))
+        return(MixedNum.__make([el for el in self.__list if not el.rational.isZero()]))
+
+    def normalize(self):
+        """the usual view in one pass: fractions in the mixed notation (they are always reduced), without zero-elements"""
+        return(MixedNum.__make([Elem(el.rational.mixed(), el.measure) for el in self.__list if not el.rational.isZero()]))
 
     def fold_measures(self):
         outList = []
@@ -292,14 +509,25 @@ class MixedNum:
     def with_rationals(self, func, pars=None):
         """apply a function to the rational part of the MixedNumber elements"""
 
-        """in this way it is possible, for example, to multiply (by a measureless number), reduce, etc."""
+        """in this way it is possible, for example, to multiply (by a measureless number), reduce, etc.
+arithmetic functions of Rational accept plain int and fractions.Fraction as pars as well"""
         outList = []
         for el in self.list:
             if pars == None:
                 outList.append(Elem(func(el.rational), el.measure))
             else:
                 outList.append(Elem(func(el.rational,pars), el.measure))
-        return(MixedNum(outList))
+        # the measures are not changed, so they are still different
+        return(MixedNum.__make(outList))
+
+    @staticmethod
+    def sum(mixNums):
+        """sum of many mixed numbers (the same as compose, without the intermediate numbers)"""
+        return(MixedNumBuilder().add_mixed(*mixNums).freeze())
+
+    def limit_denominator(self, maxDen):
+        """best approximations of the fractions with denominators not greater than maxDen"""
+        return(self.with_rationals(Frac.limit_denominator, maxDen))
 
     def times(self, other, converter):
 
@@ -351,7 +579,7 @@ class MixedNum:
             if msr in msrSelf:
                 elSelf  = lwSelf.get_elem_by_measure(msr)
                 elOther = lwOther.get_elem_by_measure(msr)
-                quotient = elSelf.rational.div(elOther.rational).reduce()
+                quotient = elSelf.rational.div(elOther.rational)
                 if exsDirection == None: 
                     exsDirection = quotient.intSign() # архивируем знак (направление исчерпывания)
                 else:
@@ -361,15 +589,15 @@ class MixedNum:
                         minQuotient = Frac()
                         break
 
-                if (minQuotient == None) or (quotient.abs().intComp(minQuotient.abs()) < 0):
-                    minQuotient = Frac(**quotient.dict())
+                if (minQuotient == None) or (quotient.abs() < minQuotient.abs()):
+                    minQuotient = quotient
             else:
                 # если в делителе есть единица, не входящая в состав делимого
                 # то делимое невозможно исчерпать делителем, седовательно делитель содержится в делимом ноль раз
                 minQuotient = Frac()
                 break
         # вычитаем из делимого делитель, умноженный на найденное минимальное частное
-        remainder = self.compose(other.with_rationals(Frac.mul, minQuotient).with_rationals(Frac.opposite))
+        remainder = MixedNumBuilder(self.__list).sub_mixed(other.with_rationals(Frac.mul, minQuotient)).freeze()
 
         return(minQuotient, remainder)
 
@@ -438,154 +666,271 @@ class MixedNum:
         return result 
 
 
+class MixedNumBuilder:
+    """mutable accumulator of the elements of a mixed number
+
+    Elements are added in place: the fractions of the same-measure elements are summed
+    without intermediate numbers; freeze() gives the (immutable) MixedNum,
+    the same as MixedNum of all the added elements.
+
+    """
+
+    __slots__ = ('__elems', '__sums', '__index')
+
+    def __init__(self, inList = []):
+        self.__elems = [] # first element of every measure
+        self.__sums  = [] # accumulators of the same-measure elements (by index), None if the element is single
+        self.__index = {} # measure: index
+        for el in inList:
+            self.add(el)
+
+    def __len__(self):
+        return(len(self.__elems))
+
+    def add(self, elem):
+        """add an element, returns the builder itself"""
+        if not isinstance(elem, Elem):
+            raise ValueError("incorrect element of mixed number")
+        idx = self.__index.get(elem.measure)
+        if idx == None:
+            self.__index[elem.measure] = len(self.__elems)
+            self.__elems.append(elem)
+            self.__sums.append(None)
+        else:
+            if self.__sums[idx] == None:
+                self.__sums[idx] = RationalAccumulator((self.__elems[idx].rational,))
+            self.__sums[idx].add(elem.rational)
+        return self
+
+    def add_mixed(self, *mixNums):
+        """add all elements of the mixed numbers (compose in place), returns the builder itself"""
+        for mixNum in mixNums:
+            for el in mixNum.list:
+                self.add(el)
+        return self
+
+    def sub_mixed(self, *mixNums):
+        """substract the mixed numbers (add the opposite elements), returns the builder itself"""
+        for mixNum in mixNums:
+            for el in mixNum.list:
+                self.add(Elem(el.rational.opposite(), el.measure))
+        return self
+
+    def freeze(self):
+        """the accumulated value as MixedNum; the builder can be used further"""
+        outList = []
+        for idx in range(len(self.__elems)):
+            if self.__sums[idx] == None:
+                outList.append(self.__elems[idx])
+            else:
+                outList.append(Elem(self.__sums[idx].value(), self.__elems[idx].measure))
+        # the elements are already merged: trusted constructor of MixedNum
+        return(MixedNum._MixedNum__make(outList))
+
+class _RatesView(Mapping):
+
+    """Table of the rates of the converter {(source, target): {'multiplicity': , 'rate': }},
+    generated on demand from the unit sets (see Converter).
+    The rates added explicitly (and their reverse rates) are given as recorded,
+    the derived rates are reduced, with the sign on the multiplicity.
+
+    """
+
+    __slots__ = ('__converter', '__members', '__recorded')
+
+    def __init__(self, converter, members, recorded):
+        self.__converter = converter
+        self.__members   = members
+        self.__recorded  = recorded
+
+    def __getitem__(self, pair):
+        if not (isinstance(pair, tuple) and len(pair) == 2):
+            raise KeyError(pair)
+        recorded = self.__recorded.get(pair)
+        if recorded != None:
+            return {'multiplicity': recorded[0], 'rate': recorded[1]}
+        source, target = pair
+        rate = None if source == target else self.__converter.get_unit_rate(source, target)
+        if rate == None:
+            raise KeyError(pair)
+        num, den = rate.ratio()
+        return {'multiplicity': num, 'rate': den}
+
+    def __iter__(self):
+        # units in the order of their addition (the order does not depend on hashing)
+        for units in self.__members.values():
+            for source in units:
+                for target in units:
+                    if source != target:
+                        yield (source, target)
+
+    def __len__(self):
+        return(sum([len(el) * (len(el) - 1) for el in self.__members.values()]))
+
+class _UnitsView(Sequence):
+
+    """List of the unit sets of the converter, generated on demand (see Converter);
+    the output lists the units in the order of their addition
+
+    """
+
+    __slots__ = ('__members',)
+
+    def __init__(self, members):
+        self.__members = members
+
+    def __getitem__(self, idx):
+        return(set(list(self.__members.values())[idx]))
+
+    def __iter__(self):
+        for units in self.__members.values():
+            yield set(units)
+
+    def __len__(self):
+        return(len(self.__members))
+
+    def __repr__(self):
+        return('[' + ', '.join(['{' + ', '.join([repr(unit) for unit in units]) + '}' for units in self.__members.values()]) + ']')
+
 class Converter:
     """converts one measure to another if a corresponding exchange rate exists"""
 
     # именно и только converter знает о соотношениях единиц между собой
-    # rates - главный объект конвертера, таблица (словарь) курсов
     # (используеся терминология курсов валют: исходная единица, целевая, кратность, курс)
-    # вспомогательные объекты:
-    # units - список множеств, отдельное множество - это перечень базовых единиц, относящихся к одному контексту
-    # (то есть таких, которые могут быть взаимно выражены друг через друга)
+    # единицы, выражаемые друг через друга, образуют сеты (множества);
+    # сеты хранятся как деревья (union-find): у каждой единицы есть родитель и курс к нему,
+    # у корня сета родителя нет.
+    # Курс любой пары единиц сета вычисляется по запросу - через курсы обеих единиц к корню,
+    # поэтому добавление курса не требует расчета кросс-курсов со всеми единицами сета.
+    # rates (таблица курсов всех пар) и units (список сетов) - представления, формируемые по запросу
     
     def __init__(self) -> None:
-        self.__rates    = {}    # list of dictionaries, contains rates to convert one measure to another
-        self.__units = []       # ??UNNECESSARY?? list of sets, every set contains "line" (unordered) of units of one context
-        # units используется теперь фактически только при расчете кросс-курсов (оптимизирует поиск,
-        # но тратится время на само заполнение units
-        # кроме того, это единственный объект, который различает отдельные "линейки", полезен для пользователя
-        # надо ли? теоретически изолированные сеты можно получить рассчетным методом по таблице курсов)
-        self.__aliases = {} # словарь имен производных единиц (1 литр = 0.001 м^3) {имя: элемент}
+        self.__parents = {}  # unit: parent unit (the root of a set is its own parent)
+        self.__toParent = {} # unit: rate that converts the unit to the parent
+        self.__members = {}  # root: list of units of the set
+        self.__recorded = {} # (source, target): (multiplicity, rate) as added, and the reverse
+        self.__aliases = {}  # словарь имен производных единиц (1 литр = 0.001 м^3) {имя: элемент}
+        self.__aliasOf = {}  # root: unit of the set having an alias (all units of such set have aliases)
 
     @property
     def rates(self):
-        return(self.__rates)
+        return(_RatesView(self, self.__members, self.__recorded))
 
     @property
     def units(self):
-        return(self.__units)
+        return(_UnitsView(self.__members))
 
     @property
     def aliases(self):
         return(self.__aliases)
 
-    def add_rate(self, source, target, multiplicity, rate):
-        """add main and dependent (cross and reverse) rates"""
-
-        #inner auxiliary functions
-        def update_units(*inNames):
-            """add a measure to the corresponding set"""
-
-            outList = []
-            crSet = {*inNames}
-            for mSt in self.__units:
-                found = False
-                for name in inNames:
-                    if name in mSt:
-                        found = True
-                        crSet = crSet.union(mSt)
-                        break
-                if not found:
-                    outList.append(mSt)
-            outList.append(crSet)
-            self.__units = outList
-            return self.__units[-1]
-
-        def add_cross_rate(base, cross, unitSet, depth = False):
-            """cross-rates"""
-            
-            for msreFound in unitSet:
-                if msreFound == cross:
-                    continue
+    def __find(self, unit):
+        """(root of the set, rate that converts the unit to the root) or None if the unit has no rates;
+the path to the root is compressed
 
-                if (msreFound,cross) in self.__rates:
-                    continue
+        """
+        parent = self.__parents.get(unit)
+        if parent == None:
+            return None
+        path = []
+        while parent != unit:
+            path.append(unit)
+            unit = parent
+            parent = self.__parents[unit]
+        root = unit
+        # rates to the root, from the nearest to the root
+        toRoot = Frac(1)
+        for unit in reversed(path):
+            toRoot = self.__toParent[unit].mul(toRoot)
+            self.__parents[unit]  = root
+            self.__toParent[unit] = toRoot
+        return (root, self.__toParent[path[0]] if path else Frac(1))
+
+    @staticmethod
+    def __as_ratio(value):
+        """(numerator, denominator) of Rational or of the pair of ints as entered (see RatioString.ratio_from_string)"""
+        if isinstance(value, Frac):
+            return value.ratio()
+        num, den = value
+        if type(num) is not int or type(den) is not int or den == 0:
+            raise ValueError('incorrect multiplicity or rate: ' + str(value))
+        return (num, den)
 
-                rateBase  = self.__rates[(base, cross)]
-                rateFound = self.__rates[(base, msreFound)]
+    def add_rate(self, source, target, multiplicity, rate):
+        """add the rate; all the dependent (cross and reverse) rates are known after that.
+multiplicity and rate are Rational or pairs of ints (numerator, denominator) as entered,
+the rate is recorded as entered (see rates)
 
-                multiplicity = rateFound['rate']         * rateBase['multiplicity']
-                rate         = rateFound['multiplicity'] * rateBase['rate']
-                gcd_ = Frac.gcd(multiplicity, rate)
-                add_record(
-                    msreFound, cross, unitSet
-                        ,multiplicity // gcd_
-                        ,rate         // gcd_
-                    )
-                if not depth:
-                    # для случаев, когда два разных сета объединяются достаточно поздно
-                    # (например, соответствие двух линеек устанавливается после того,
-                    # как обе линейки уже заполнены)
-                    # потребуется рекурсивный вызов, 
-                    # но глубина рекурсии заведомо ограничена двумя уровнями 
-                    # (одно соответствие по определению связывет только две единицы)
-                    add_cross_rate(cross, msreFound, unitSet, True)
-                
-
-        def add_record(source, target, unitSet, multiplicity, rate):
-            """elementary entry of rate table"""
-
-            # таблица устроена как словарь, 
-            # где ключом является кортеж (исходная + целевая единица),
-            # данными - словарь {кратность, курс}
-
-            self.__rates[(source, target)] = {
-                                                'multiplicity': multiplicity
-                                                ,'rate':        rate
-                                            }
-
-            #alias
-            al = self.__aliases.get(target)
-            if al:
-                self.add_alias_record(source, Elem(al.rational.mul(Frac.shorter(rate,multiplicity)).reduce(),al.measure))
-
-            # reverse record
-            if not (target, source) in self.__rates:
-                add_record(target, source, unitSet, rate, multiplicity)
-            
-            return True
+        """
 
-        # main function body
         if source == target:
             return False
 
-        if multiplicity.isZero() or rate.isZero():
+        mNum, mDen = Converter.__as_ratio(multiplicity)
+        rNum, rDen = Converter.__as_ratio(rate)
+        if mNum == 0 or rNum == 0:
             return False
 
-        if (source,target) in self.__rates:
+        for unit in (source, target):
+            if unit not in self.__parents:
+                self.__parents[unit]  = unit
+                self.__toParent[unit] = Frac(1)
+                self.__members[unit]  = [unit]
+                if unit in self.__aliases:
+                    self.__aliasOf[unit] = unit
+
+        srcRoot, srcRate = self.__find(source)
+        tgtRoot, tgtRate = self.__find(target)
+        if srcRoot == tgtRoot:
+            # the rate is known already (directly or through other units)
             return False
 
-        # multiplicity and rate may be fractional, 
-        # must convert them to integers
-        commonMult = Frac(multiplicity.denominator * rate.denominator)
-        
-        multiplicity = multiplicity.mul(commonMult).simple()
-        multiplicity = (multiplicity.numerator // multiplicity.denominator)*multiplicity.intSign()
-        
-        rate = rate.mul(commonMult).simple()
-        rate = (rate.numerator // rate.denominator)*rate.intSign()
-
-        unitSet = update_units(source, target)
-
-        add_record(source, target, unitSet, multiplicity, rate)
-        add_cross_rate(source, target, unitSet)
-        add_cross_rate(target, source, unitSet)
+        # the rate is recorded as integers (fractional multiplicity and rate are multiplied by their denominators)
+        self.__recorded[(source, target)] = (mNum * rDen, rNum * mDen)
+        self.__recorded[(target, source)] = (rNum * mDen, mNum * rDen)
+
+        # rate source -> target (see get_unit_rate), then root of source -> root of target
+        rootRate = srcRate.reciprocal().mul(Frac.shorter(mNum * rDen, mDen * rNum)).mul(tgtRate)
+
+        # the smaller set is attached to the root of the larger one
+        if len(self.__members[srcRoot]) > len(self.__members[tgtRoot]):
+            srcRoot, tgtRoot = tgtRoot, srcRoot
+            rootRate = rootRate.reciprocal()
+        newUnits = self.__members.pop(srcRoot)
+        oldUnits = self.__members[tgtRoot]
+        self.__parents[srcRoot]  = tgtRoot
+        self.__toParent[srcRoot] = rootRate
+
+        # units of the set without aliases get the aliases of the joined set
+        # (a set with an alias has the aliases for all of its units already, see add_alias),
+        # so every unit gets its alias once
+        newAlias = self.__aliasOf.pop(srcRoot, None)
+        oldAlias = self.__aliasOf.get(tgtRoot)
+        if newAlias != None and oldAlias == None:
+            self.__aliasOf[tgtRoot] = newAlias
+            self.__spread_alias(newAlias, list(oldUnits))
+        elif oldAlias != None and newAlias == None:
+            self.__spread_alias(oldAlias, newUnits)
+        oldUnits.extend(newUnits)
 
         return True
 
+    def __spread_alias(self, alias, units):
+        """aliases of the units by the alias of the unit of the same set"""
+        elem = self.__aliases[alias]
+        for uni in units:
+            if uni != alias:
+                self.add_alias_record(uni, Elem(elem.rational.div(self.get_unit_rate(uni, alias)).reduce(), elem.measure))
+
     def get_unit_rate(self, source, target):
         """multiplier that converts the source unit to the target OR None"""
         if source == target:
             return(Frac(1))
-        rate = self.__rates.get((source,target))
-        if rate:
-            return(
-                Frac.shorter(
-                    numerator    = rate['multiplicity']
-                    ,denominator = rate['rate']
-                )
-            )
-        return None
+        srcFound = self.__find(source)
+        tgtFound = self.__find(target)
+        if srcFound == None or tgtFound == None or srcFound[0] != tgtFound[0]:
+            return None
+        return(srcFound[1].div(tgtFound[1]))
 
     def get_measure_rate(self, source, target):
         """multiplier that converts the source measure to the target OR None"""
@@ -644,7 +989,7 @@ class Converter:
                 for idx in range(len(tgtParts)):
                     if tgtParts[idx].exponent == expo:
 
-                        if srcPart.name == tgtParts[idx].name:
+                        if srcPart.unitId == tgtParts[idx].unitId:
                             found = True
                             break
 
@@ -669,27 +1014,25 @@ class Converter:
 
     def get_unitSet(self, unit):
         """return set where the inMeasure is"""
-        for el in self.__units:
-            if unit in el:
-                return el
-        return None
+        found = self.__find(unit)
+        if found == None:
+            return None
+        return(set(self.__members[found[0]]))
 
     def add_alias_record(self, alias, elem):
         if alias in self.__aliases:
             return False
         self.__aliases[alias] = elem
+        found = self.__find(alias)
+        if found != None:
+            self.__aliasOf.setdefault(found[0], alias)
         return True
 
     def add_alias(self, alias, elem):
         if self.add_alias_record(alias, elem):
-            unitSet = self.get_unitSet(alias)
-            if unitSet:
-                for uni in unitSet:
-                    if uni == alias:
-                        continue
-                    rate = self.get_unit_rate(uni, alias)
-                    if rate:
-                        self.add_alias_record(uni, Elem(elem.rational.div(rate).reduce(),elem.measure))
+            found = self.__find(alias)
+            if found != None:
+                self.__spread_alias(alias, self.__members[found[0]])
             return True
 
         return False
@@ -742,14 +1085,14 @@ class Converter:
         for inPart in inMeasure.list:
             # очередной юнит сверяем с юнитами результирующего списка
             # (в начале он пуст)
-            chosenMsr = MsrPart(inPart.name, inPart.exponent)
+            chosenMsr = inPart
             for idx in range(len(outList)):
-                if outList[idx].name == chosenMsr.name:
+                if outList[idx].unitId == chosenMsr.unitId:
                     continue
                 # текущий множитель, преобразующий юнит списка к очередному
                 opMult = self.get_unit_rate(outList[idx].name, chosenMsr.name)
                 if opMult:
-                    if Frac(1).intComp(opMult) > 0:
+                    if opMult < 1:
                         # текущий множитель меньше единицы:
                         # в результирующем списке юнит с бОльшей единицей
                         # подменяем в нем имя единицы на имя очередного юнита
@@ -812,11 +1155,11 @@ class Converter:
                             # если текущий делитель меньше сохраненного
                             # значит, он приведет число к большему значению 
                             # (что соответствует меньшей единице)
-                            or opDiv.intComp(divisor) < 0
+                            or opDiv < divisor
                     )
                 ):
                     # перезаписываем делитель и запоминаем текущую единицу
-                    divisor = Frac(**opDiv.dict())
+                    divisor = opDiv
                     chosenMsr = inMsr.combine()
             if divisor:
                 lowest.append(Elem(el.rational.div(divisor),chosenMsr))
@@ -5,26 +5,55 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-# Версия 2023-01-27
+# Версия 2023-02-24
 
 """Convert Mixed Numbers from/to string"""
 
-from ratiostr import RatioString as FStr
+import re
+from functools import lru_cache
+
+from ratiostr import RatioString as FStr, RatioFormat, ParseError, _ratio_from_groups
 from mixednum import MixedNum, Elem, MsrPart, Measure
 
-class MixedString(FStr):
-    __sprFld = ';'
+def _compile_field(negasign, sprInt, sprFrac, sprFld):
+    """regular expression of one field of a mixed number: [-][I][sprInt[N]][sprFrac[D]][measure]
+the measure is everything up to the next sprFld
 
-    # separators of measure
-    __sprDiv = '/'
-    __sprMul = '*'
-    __sprPow = ':' #'^'
+    """
+    return re.compile(
+        r'\s*(?:({neg})\s*)?(\d*)(?:({sprI})(\d*))?(?:({sprF})(\d*))?([^{sprFld}]*)'.format(
+            neg = re.escape(negasign), sprI = re.escape(sprInt), sprF = re.escape(sprFrac), sprFld = re.escape(sprFld)
+        )
+    )
 
-    @classmethod
-    def __is_separators_correct(cls, sprFld, sprInt, sprFrac, sprDiv, sprMul, sprPow):
+class MixedFormat(RatioFormat):
+
+    """Immutable format of mixed numbers: separators of the fractions and of the measures
+
+    Every format keeps its own bounded (LRU) caches of parsed and formatted measures:
+    the set of the unit strings in real inputs is small.
+    The caches belong to the separators, a format with other separators is a new instance with new caches.
+
+    """
+
+    __slots__ = ('__sprFld', '__sprDiv', '__sprMul', '__sprPow', '__field', '__measureFrom', '__measureTo')
+
+    def __init__(self, sprFld = ';', sprInt = '.', sprFrac = '/', sprDiv = '/', sprMul = '*', sprPow = ':', cacheSize = 1024):
+        super().__init__(sprInt, sprFrac)
+        if not self.is_measure_separators_correct(sprFld, sprDiv, sprMul, sprPow):
+            raise ValueError('incorrect separators of mixed number format')
+        self.__sprFld = sprFld
+        self.__sprDiv = sprDiv
+        self.__sprMul = sprMul
+        self.__sprPow = sprPow #'^'
+        self.__field  = _compile_field(self.negasign, self.sprInt, self.sprFrac, sprFld)
+        self.__measureFrom = lru_cache(maxsize = cacheSize)(self.__parse_measure)
+        self.__measureTo   = lru_cache(maxsize = cacheSize)(self.__format_measure)
+
+    def is_measure_separators_correct(self, sprFld, sprDiv, sprMul, sprPow):
         return(
-                # numper parts must not match with FStr separators
-                len({cls._RatioString__negasign, sprFld,sprInt, sprFrac}) == 4
+                # numper parts must not match with fraction separators
+                len({self.negasign, sprFld, self.sprInt, self.sprFrac}) == 4
                 # measure parts must not match
                 and len({sprDiv, sprMul, sprPow}) == 3
                 # must be string
@@ -44,49 +73,150 @@ class MixedString(FStr):
                 and sprPow.strip()  != ''
                 )
 
-    @classmethod
-    def set_separators(cls, sprFld, sprInt, sprFrac, sprDiv, sprMul, sprPow):
-        if (
-            cls.__is_separators_correct(sprFld, sprInt, sprFrac, sprDiv, sprMul, sprPow)
-            and super().set_separators(sprInt, sprFrac)
-            ):
-            cls.__sprFld = sprFld
-            cls.__sprDiv = sprDiv
-            cls.__sprMul = sprMul
-            cls.__sprPow = sprPow
-            return True
-        return False
+    @property
+    def sprFld(self):
+        return(self.__sprFld)
 
-    @classmethod
-    def to_string(cls, mixNum) -> str:
+    @property
+    def sprDiv(self):
+        return(self.__sprDiv)
+
+    @property
+    def sprMul(self):
+        return(self.__sprMul)
+
+    @property
+    def sprPow(self):
+        return(self.__sprPow)
+
+    def to_string(self, mixNum) -> str:
         outList = []
         for elem in mixNum.list:
             outList.append('{frac} {msr}'.format(
                 frac  = super().to_string(elem.rational)
-                ,msr = cls.measure_to_string(elem.measure)
+                ,msr = self.measure_to_string(elem.measure)
                 )
             )
         if not len(outList):
             # empty value
             outList.append(super().to_string(super().from_string("")[0]))
-        return (cls.__sprFld + ' ').join(outList)
+        return (self.__sprFld + ' ').join(outList)
 
-    @classmethod
-    def from_string(cls, instr = ''):
+    def write_many(self, mixNums, stream, end = '\n', bufferSize = 1024):
+        """write mixed numbers to a text stream: each as to_string followed by end;
+the strings are collected and written by blocks of bufferSize numbers
+
+        """
+        negasign = self.negasign
+        sprInt   = self.sprInt
+        sprFrac  = self.sprFrac
+        sprFld   = self.__sprFld + ' '
+        measureTo = self.__measureTo
+        buffer = []
+        for mixNum in mixNums:
+            outList = []
+            for elem in mixNum.list:
+                intPart, numerator, denominator, isNegative = elem.rational.tuple()
+                outList.append(
+                    (negasign if isNegative else '')
+                    + str(intPart) + sprInt + str(numerator) + sprFrac + str(denominator)
+                    + ' ' + measureTo(tuple([(el.name, el.exponent) for el in elem.measure.list]))
+                )
+            if outList:
+                buffer.append(sprFld.join(outList))
+            else:
+                # empty value
+                buffer.append(self.to_string(mixNum))
+            buffer.append(end)
+            if len(buffer) >= 2 * bufferSize:
+                stream.write(''.join(buffer))
+                buffer.clear()
+        if buffer:
+            stream.write(''.join(buffer))
+
+    def to_decimal_string(self, mixNum, digits = 20, rounding = 'half_even', period = False) -> str:
+        """alternative output: exact decimal notation of the fractions (see RatioString.to_decimal)"""
+        outList = []
+        for elem in mixNum.list:
+            outList.append('{dec} {msr}'.format(
+                dec  = super().to_decimal(elem.rational, digits, rounding, period)
+                ,msr = self.measure_to_string(elem.measure)
+                )
+            )
+        if not len(outList):
+            # empty value
+            outList.append(super().to_decimal(super().from_string("")[0], digits, rounding, period))
+        return (self.__sprFld + ' ').join(outList)
+
+    def from_string(self, instr = ''):
+        """parse mixed number from string like '-I.N/D measure; -I.N/D measure'
+in one pass over the string (fields are not split out);
+raises ParseError with the position of the incorrect part
+
+        """
         outList = []
-        for strNum in instr.split(cls.__sprFld):
-            parts = super().from_string(strNum)
-            outList.append(Elem(parts[0], cls.measure_from_string(parts[1])))
+        pos = 0
+        while True:
+            match = self.__field.match(instr, pos)
+            neg, intPart, sprInt, numerator, sprFrac, denominator, tail = match.groups('')
+            try:
+                frac = _ratio_from_groups(intPart, sprInt, numerator, sprFrac, denominator, bool(neg))
+            except ValueError as err:
+                raise ParseError(str(err), match.start(2))
+            tail = tail.rstrip()
+            try:
+                measure = self.measure_from_string(tail)
+            except ValueError as err:
+                # the incorrect part of the measure is the second argument of the error
+                part = err.args[1] if len(err.args) > 1 else ''
+                offset = tail.find(part)
+                if offset < 0:
+                    part = tail
+                    offset = 0
+                # the position of the token itself, not of the whitespace before it
+                offset += len(part) - len(part.lstrip())
+                raise ParseError(err.args[0] + repr(part), match.start(7) + offset)
+            outList.append(Elem(frac, measure))
+            pos = match.end()
+            if pos >= len(instr):
+                break
+            # the pattern stops only at the field separator or at the end of string
+            pos += 1
         return MixedNum(outList)
 
-    @classmethod
-    def measure_from_string(cls, inStr = ''):
+    def parse_many(self, strings):
+        """parse many strings (see from_string);
+returns tuple (results, errors): results are mixed numbers or None for incorrect strings,
+errors are tuples (index, message), the message includes the position of the incorrect part
+
+        """
+        return(super().parse_many(strings))
+
+    def cache_info(self):
+        """hit/miss statistics of the measure caches"""
+        return {
+            'measure_from_string' : self.__measureFrom.cache_info()
+            ,'measure_to_string'  : self.__measureTo.cache_info()
+        }
+
+    def cache_clear(self):
+        self.__measureFrom.cache_clear()
+        self.__measureTo.cache_clear()
+
+    def measure_from_string(self, inStr = ''):
+        # the same measure with different spacing is one entry of the cache
+        return(self.__measureFrom(inStr.strip()))
+
+    def measure_to_string(self, measure):
+        return(self.__measureTo(tuple([(el.name, el.exponent) for el in measure.list])))
+
+    def __parse_measure(self, inStr):
         outList = []
         sign = 1 # first part of measure is positive
-        for div in inStr.split(cls.__sprDiv):
+        for div in inStr.split(self.__sprDiv):
             # parts with positive and negative exponents
-            for mul in div.split(cls.__sprMul):
-                nameAndExpo = mul.split(cls.__sprPow)
+            for mul in div.split(self.__sprMul):
+                nameAndExpo = mul.split(self.__sprPow)
                 if len(nameAndExpo) < 2:
                     nameAndExpo.append('1')
                 if not nameAndExpo[1]:
@@ -109,19 +239,19 @@ class MixedString(FStr):
                 break
         return(Measure(outList))
 
-    @classmethod
-    def measure_to_string(cls, measure):
+    def __format_measure(self, parts):
+        """parts are tuples (name, exponent)"""
         # parts with positive and negative exponents
         positive = []
         negative = []
-        for el in measure.list:
-            absExpo = abs(el.exponent)
+        for name, exponent in parts:
+            absExpo = abs(exponent)
             strPart = '{name}{pow}{expo}'.format(
-                name  = el.name
-                ,pow  = cls.__sprPow if absExpo != 1 else ''
+                name  = name
+                ,pow  = self.__sprPow if absExpo != 1 else ''
                 ,expo = str(absExpo) if absExpo != 1 else ''
                 )
-            if el.exponent > 0:
+            if exponent > 0:
                 positive.append(strPart)
             else:
                 negative.append(strPart)
@@ -133,8 +263,69 @@ class MixedString(FStr):
 
         return(
                 '{pos}{div}{neg}'.format(
-                    pos  = cls.__sprMul.join(positive) if len(positive) != 0 else '<>'
-                    ,div = cls.__sprDiv if len(negative) != 0 else ''
-                    ,neg = cls.__sprMul.join(negative) if len(negative) != 0 else ''
+                    pos  = self.__sprMul.join(positive) if len(positive) != 0 else '<>'
+                    ,div = self.__sprDiv if len(negative) != 0 else ''
+                    ,neg = self.__sprMul.join(negative) if len(negative) != 0 else ''
             )
         )
+
+
+class MixedString(FStr):
+
+    """Class methods use the default format of the class (see set_separators, set_format)
+    or the format passed explicitly.
+
+    """
+
+    @classmethod
+    def set_format(cls, fmt):
+        """replace the default format of the class"""
+        if not isinstance(fmt, MixedFormat):
+            return False
+        return super().set_format(fmt)
+
+    @classmethod
+    def set_separators(cls, sprFld, sprInt, sprFrac, sprDiv, sprMul, sprPow):
+        try:
+            fmt = MixedFormat(sprFld, sprInt, sprFrac, sprDiv, sprMul, sprPow)
+        except (ValueError, TypeError):
+            return False
+        return cls.set_format(fmt)
+
+    @classmethod
+    def to_string(cls, mixNum, fmt = None) -> str:
+        return((fmt or cls.get_format()).to_string(mixNum))
+
+    @classmethod
+    def write_many(cls, mixNums, stream, end = '\n', bufferSize = 1024, fmt = None):
+        """write mixed numbers to a text stream, one per line (see MixedFormat.write_many)"""
+        (fmt or cls.get_format()).write_many(mixNums, stream, end, bufferSize)
+
+    @classmethod
+    def to_decimal_string(cls, mixNum, digits = 20, rounding = 'half_even', period = False, fmt = None) -> str:
+        """alternative output: exact decimal notation of the fractions (see RatioFormat.to_decimal)"""
+        return((fmt or cls.get_format()).to_decimal_string(mixNum, digits, rounding, period))
+
+    @classmethod
+    def from_string(cls, instr = '', fmt = None):
+        return((fmt or cls.get_format()).from_string(instr))
+
+    @classmethod
+    def parse_many(cls, strings, fmt = None):
+        """parse many strings (see MixedFormat.parse_many)"""
+        return((fmt or cls.get_format()).parse_many(strings))
+
+    @classmethod
+    def measure_from_string(cls, inStr = '', fmt = None):
+        return((fmt or cls.get_format()).measure_from_string(inStr))
+
+    @classmethod
+    def measure_to_string(cls, measure, fmt = None):
+        return((fmt or cls.get_format()).measure_to_string(measure))
+
+    @classmethod
+    def cache_info(cls, fmt = None):
+        """hit/miss statistics of the measure caches"""
+        return((fmt or cls.get_format()).cache_info())
+
+MixedString.set_format(MixedFormat())
@@ -0,0 +1,215 @@
+# Any copyright is dedicated to the Public Domain.
+# https://creativecommons.org/publicdomain/zero/1.0/
+# ===================== OR =========================
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at https://mozilla.org/MPL/2.0/.
+
+# Версия 2023-03-02
+
+"""Arrays of rational numbers (vectorized exact arithmetic, requires numpy)"""
+
+from fractions import Fraction
+from numbers import Integral
+
+import numpy as np
+
+from rationals import Rational as Frac
+
+_INT64_MAX = int(np.iinfo(np.int64).max)
+
+def _max_abs(values):
+    """the greatest absolute value of an array (or of a single int)"""
+    if isinstance(values, np.ndarray):
+        return int(np.abs(values).max()) if values.size else 0
+    return abs(values)
+
+def _as_object(values):
+    """array of python ints (arbitrary precision); single int is returned as is"""
+    if isinstance(values, np.ndarray) and values.dtype != object:
+        return values.astype(object)
+    return values
+
+class RationalArray:
+
+    """Array of rational numbers in canonical form:
+    signed numerators over positive, reduced denominators.
+
+    Numerators and denominators are stored as int64 arrays;
+    if a result may overflow int64, the operation is made with python ints (object arrays),
+    and the result returns to int64 as soon as it fits.
+
+    """
+
+    __slots__ = ('__num', '__den')
+
+    def __init__(self, numerators = (), denominators = None):
+        numerators = [int(el) for el in numerators]
+        if denominators is None:
+            denominators = [1] * len(numerators)
+        else:
+            denominators = [int(el) for el in denominators]
+        if len(numerators) != len(denominators):
+            raise ValueError('numerators and denominators must have the same length')
+        if 0 in denominators:
+            raise ZeroDivisionError('zero denominator in rational array')
+
+        num = np.array(numerators,   dtype = object)
+        den = np.array(denominators, dtype = object)
+        # sign goes to the numerator
+        negative = den < 0
+        num[negative] = -num[negative]
+        den[negative] = -den[negative]
+        self.__set(num, den)
+
+    def __set(self, num, den):
+        """set canonical (reduced) parts, int64 if they fit"""
+        gcd_ = np.gcd(num, den)
+        num = num // gcd_
+        den = den // gcd_
+        if num.dtype == object and max(_max_abs(num), _max_abs(den)) <= _INT64_MAX:
+            num = num.astype(np.int64)
+            den = den.astype(np.int64)
+        self.__num = num
+        self.__den = den
+
+    @staticmethod
+    def __make(num, den):
+        """trusted constructor for the results of own operations (den > 0)"""
+        arr = RationalArray.__new__(RationalArray)
+        arr.__set(num, den)
+        return arr
+
+    @staticmethod
+    def from_rationals(fracs):
+        """array from a list of Rational"""
+        ratios = [frac.ratio() for frac in fracs]
+        return RationalArray([el[0] for el in ratios], [el[1] for el in ratios])
+
+    @staticmethod
+    def from_parts(numerators, denominators):
+        """array from numpy arrays of numerators and positive denominators (not checked); the parts are reduced"""
+        return RationalArray.__make(np.asarray(numerators), np.asarray(denominators))
+
+    def rationals(self):
+        """list of Rational"""
+        return [Frac.shorter(int(num), int(den)) for num, den in zip(self.__num, self.__den)]
+
+    def __len__(self):
+        return len(self.__num)
+
+    def __getitem__(self, idx):
+        return Frac.shorter(int(self.__num[idx]), int(self.__den[idx]))
+
+    def __str__(self):
+        return(str([str(num) + '/' + str(den) for num, den in zip(self.__num, self.__den)]))
+
+    @property
+    def numerators(self):
+        return(self.__num)
+
+    @property
+    def denominators(self):
+        return(self.__den)
+
+    @property
+    def isObject(self):
+        """if the parts are stored as python ints (do not fit int64)"""
+        return(self.__num.dtype == object)
+
+    def __operands(self, other):
+        """(numerators, denominators) of self and of other: RationalArray of the same length, Rational, integer or Fraction"""
+        if isinstance(other, RationalArray):
+            if len(other) != len(self):
+                raise ValueError('rational arrays must have the same length')
+            return (self.__num, self.__den, other.__num, other.__den)
+        if isinstance(other, Frac):
+            oNum, oDen = other.ratio()
+        elif isinstance(other, Fraction):
+            oNum, oDen = other.numerator, other.denominator
+        elif isinstance(other, Integral):
+            # int, numpy integers
+            oNum, oDen = int(other), 1
+        else:
+            raise ValueError('incorrect operand of rational array')
+        if max(abs(oNum), oDen) > _INT64_MAX:
+            # numpy can not mix int64 with larger ints
+            return (_as_object(self.__num), _as_object(self.__den), oNum, oDen)
+        return (self.__num, self.__den, oNum, oDen)
+
+    def isZero(self):
+        return(self.__num == 0)
+
+    def decimal(self):
+        """float (approximate) values"""
+        if self.isObject:
+            return np.array([num / den for num, den in zip(self.__num, self.__den)], dtype = float)
+        return self.__num / self.__den
+
+    def reduce(self):
+        """reduced fractions (the values are always kept reduced, so it is self)"""
+        return self
+
+    def opposite(self):
+        return RationalArray.__make(-self.__num, self.__den)
+
+    def abs(self):
+        return RationalArray.__make(np.abs(self.__num), self.__den)
+
+    def add(self, other):
+        """addition"""
+        sNum, sDen, oNum, oDen = self.__operands(other)
+        return RationalArray.__add(sNum, sDen, oNum, oDen)
+
+    def sub(self, other):
+        """substract"""
+        sNum, sDen, oNum, oDen = self.__operands(other)
+        return RationalArray.__add(sNum, sDen, -oNum, oDen)
+
+    @staticmethod
+    def __add(sNum, sDen, oNum, oDen):
+        if (
+            _max_abs(sNum) * _max_abs(oDen) + _max_abs(oNum) * _max_abs(sDen) > _INT64_MAX
+            or _max_abs(sDen) * _max_abs(oDen) > _INT64_MAX
+        ):
+            sNum, sDen, oNum, oDen = _as_object(sNum), _as_object(sDen), _as_object(oNum), _as_object(oDen)
+        return RationalArray.__make(sNum * oDen + oNum * sDen, sDen * oDen)
+
+    def mul(self, other):
+        """multiplication"""
+        sNum, sDen, oNum, oDen = self.__operands(other)
+        return RationalArray.__mul(sNum, sDen, oNum, oDen)
+
+    def div(self, other):
+        """division"""
+        sNum, sDen, oNum, oDen = self.__operands(other)
+        if np.any(np.asarray(oNum) == 0):
+            raise ZeroDivisionError('Division by zero')
+        # multiplication by the reciprocal (sign goes to the numerator)
+        if isinstance(oNum, np.ndarray):
+            sign = np.where(oNum < 0, -1, 1)
+        else:
+            sign = -1 if oNum < 0 else 1
+        return RationalArray.__mul(sNum, sDen, oDen * sign, oNum * sign)
+
+    @staticmethod
+    def __mul(sNum, sDen, oNum, oDen):
+        # cross-cancelling before multiplying keeps the products small
+        gcdA = np.gcd(sNum, oDen)
+        gcdB = np.gcd(oNum, sDen)
+        sNum, oDen = sNum // gcdA, oDen // gcdA
+        oNum, sDen = oNum // gcdB, sDen // gcdB
+        if (
+            _max_abs(sNum) * _max_abs(oNum) > _INT64_MAX
+            or _max_abs(sDen) * _max_abs(oDen) > _INT64_MAX
+        ):
+            sNum, sDen, oNum, oDen = _as_object(sNum), _as_object(sDen), _as_object(oNum), _as_object(oDen)
+        return RationalArray.__make(sNum * oNum, sDen * oDen)
+
+    def intComp(self, other):
+        """comparison results as an array of -1/0/1 (is self less than, equal to, greater than other)"""
+        sNum, sDen, oNum, oDen = self.__operands(other)
+        if _max_abs(sNum) * _max_abs(oDen) + _max_abs(oNum) * _max_abs(sDen) > _INT64_MAX:
+            sNum, sDen, oNum, oDen = _as_object(sNum), _as_object(sDen), _as_object(oNum), _as_object(oDen)
+        # cross-multiplication, no intermediate fractions
+        return np.sign(sNum * oDen - oNum * sDen).astype(np.int8)
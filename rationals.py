@@ -9,9 +9,23 @@
 
 """Rational numbers (fractions)"""
 
+from fractions import Fraction
+from math import gcd as _gcd, lcm as _lcm, isfinite as _isfinite
+from sys import hash_info as _hashInfo
+
 class Rational:
 
-    """Rational number as [intPart]+fraction(numerator/denominator),[-]"""
+    """Rational number as [intPart]+fraction(numerator/denominator),[-]
+
+    Internally the value is always kept in one canonical form:
+    signed numerator over positive denominator, reduced.
+    Parts of the "mixed" notation (intPart, numerator) are computed on demand,
+    the only thing remembered besides the value is whether the integer part
+    is extracted (mixed notation) or not (simple notation).
+
+    """
+
+    __slots__ = ('__num', '__den', '__whole')
 
     def __init__(self, intPart: int = 0, numerator: int = 0, denominator: int = 1, isNegative: bool = False):
         def isCorrect(intPart, numerator, denominator,isNegative):
@@ -25,36 +39,66 @@ class Rational:
                 and (denominator >= 1)
             )
 
-        if isCorrect(intPart, numerator, denominator,isNegative):
-            self.__intPart     = intPart
-            self.__numerator   = numerator
-            self.__denominator = denominator
-            self.__isNegative  = isNegative
-        else:
+        if not isCorrect(intPart, numerator, denominator,isNegative):
             raise ValueError("incorrect part(s) of rational")
 
+        num = intPart * denominator + numerator
+        gcd_ = _gcd(num, denominator)
+        self.__num   = -(num // gcd_) if isNegative else num // gcd_
+        self.__den   = denominator // gcd_
+        self.__whole = intPart != 0
+
+    @staticmethod
+    def __make(num: int, den: int, whole: bool = False):
+        """trusted constructor for the results of own operations:
+num/den must already be canonical (reduced, den >= 1), nothing is checked
+(the results are always exact, see limit_denominator)
+
+        """
+        frac = Rational.__new__(Rational)
+        frac.__num   = num
+        frac.__den   = den
+        frac.__whole = whole
+        return frac
+
+    @staticmethod
+    def __make_reduced(num: int, den: int, whole: bool = False):
+        """trusted constructor that only reduces num/den (den >= 1)"""
+        gcd_ = _gcd(num, den)
+        if gcd_ == 1:
+            return Rational.__make(num, den, whole)
+        return Rational.__make(num // gcd_, den // gcd_, whole)
+
     def __str__(self):
         return(str(self.dict()))
 
     @property
     def intPart(self):
-        return(self.__intPart)
+        if self.__whole:
+            return(abs(self.__num) // self.__den)
+        return(0)
 
     @property
     def numerator(self):
-        return(self.__numerator)
+        if self.__whole:
+            return(abs(self.__num) % self.__den)
+        return(abs(self.__num))
 
     @property
     def denominator(self):
-        return(self.__denominator)
+        return(self.__den)
 
     @property
     def isNegative(self):
-        return(self.__isNegative)
+        return(self.__num < 0)
 
     def tuple(self):
         return (self.intPart, self.numerator, self.denominator, self.isNegative)
 
+    def ratio(self):
+        """canonical pair (signed numerator, denominator)"""
+        return (self.__num, self.__den)
+
     def dict(self):
         return {
                 'intPart'      : self.intPart
@@ -65,10 +109,10 @@ class Rational:
 
     def intSign(self) -> int:
         """sign as +/-1 (for evaluation)"""
-        return -1 if self.isNegative else 1
+        return -1 if self.__num < 0 else 1
 
     def isZero(self) -> bool:
-        return (self.intPart == 0 and self.numerator == 0)
+        return (self.__num == 0)
 
     def decimal(self) -> float:
         """float (approximate) value for further (human) math"""
@@ -77,168 +121,299 @@ class Rational:
 
     def mixed(self):
         """fraction with integer part extracted"""
-        return Rational(
-            self.numerator  // self.denominator + self.intPart # intPart
-            ,self.numerator %  self.denominator                # numerator
-            ,self.denominator                                  # denominator
-            ,self.isNegative                                   # isNegative
-        )
+        return Rational.__make(self.__num, self.__den, True)
 
     def simple(self):
         """proper notation of the fraction (without integer part)"""
-        return Rational(
-            0                                                 # intPart
-            ,self.intPart * self.denominator + self.numerator # numerator
-            ,self.denominator                                 # denominator
-            ,self.isNegative                                  # isNegative
-        )
+        return Rational.__make(self.__num, self.__den)
 
     def reduce(self):
-        if self.numerator == 0:
-            # simlest case: set denominator to 1
-            return Rational(self.intPart,0,1,self.isNegative) 
-
-        gcd_ = Rational.gcd(self.numerator, self.denominator)
-        return Rational(
-                self.intPart               # intPart
-                ,self.numerator   // gcd_  # numerator
-                ,self.denominator // gcd_  # denominator
-                ,self.isNegative           # isNegative
-        )
+        """reduced fraction (the value is always kept reduced, so it is self)"""
+        return self
+
+    def limit_denominator(self, maxDen: int):
+        """the closest fraction with denominator not greater than maxDen"""
+        if not (type(maxDen) is int and maxDen >= 1):
+            raise ValueError('maximal denominator must be int >= 1')
+        if self.__den <= maxDen:
+            return self
+        num, den = Rational.__best_approximation(self.__num, self.__den, maxDen)
+        return Rational.__make(num, den, self.__whole)
 
+    @staticmethod
+    def __best_approximation(num, den, maxDen):
+        """best rational approximation of num/den (continued fractions), returns (num, den)"""
+        # convergents p0/q0, p1/q1 of the continued fraction
+        p0, q0, p1, q1 = 0, 1, 1, 0
+        n, d = num, den
+        while True:
+            a  = n // d
+            q2 = q0 + a * q1
+            if q2 > maxDen:
+                break
+            p0, q0, p1, q1 = p1, q1, p0 + a * p1, q2
+            n, d = d, n - a * d
+        # the best of the last convergent and the semiconvergent
+        k = (maxDen - q0) // q1
+        if 2 * d * (q0 + k * q1) <= den:
+            return (p1, q1)
+        return (p0 + k * p1, q0 + k * q1)
 
     def opposite(self):
         """reverses the sign of a fraction"""
-        return Rational(
-            self.intPart         # intPart
-            ,self.numerator      # numerator
-            ,self.denominator    # denominator
-            ,not self.isNegative # isNegative
-        )
+        return Rational.__make(-self.__num, self.__den, self.__whole)
 
     def abs(self):
         """absolute value"""
-        return Rational(
-            self.intPart         # intPart
-            ,self.numerator      # numerator
-            ,self.denominator    # denominator
-            ,False                # isNegative
-        )
+        return Rational.__make(abs(self.__num), self.__den, self.__whole)
 
-    def add(self, other):
-        """addition"""
-        lcm_ =  Rational.lcm(self.denominator,other.denominator)
-
-        num = (
-             (  self.intPart    * lcm_
-              + self.numerator  * lcm_ // self.denominator)  * self.intSign()
-           + (  other.intPart   * lcm_
-              + other.numerator * lcm_ // other.denominator) * other.intSign()
-        )
+    @staticmethod
+    def __operand(other):
+        """canonical (numerator, denominator) of an operand: Rational, int or fractions.Fraction"""
+        if isinstance(other, Rational):
+            return (other.__num, other.__den)
+        if type(other) is int:
+            return (other, 1)
+        if isinstance(other, Fraction):
+            return (other.numerator, other.denominator)
+        raise ValueError('incorrect operand of rational: ' + str(other))
 
-        return Rational(
-            0           # intPart
-            ,abs(num)   # numerator
-            ,lcm_       # denominator
-            ,(num < 0)  # isNegative
+    def add(self, other):
+        """addition (other may be Rational, int or fractions.Fraction)"""
+        oNum, oDen = (other.__num, other.__den) if type(other) is Rational else Rational.__operand(other)
+        if self.__den == oDen:
+            return Rational.__make_reduced(self.__num + oNum, oDen)
+        return Rational.__make_reduced(
+            self.__num * oDen + oNum * self.__den  # numerator
+            ,self.__den * oDen                     # denominator
         )
 
     def sub(self, other):
         """substract"""
-        return self.add(other.opposite())
+        oNum, oDen = (other.__num, other.__den) if type(other) is Rational else Rational.__operand(other)
+        if self.__den == oDen:
+            return Rational.__make_reduced(self.__num - oNum, oDen)
+        return Rational.__make_reduced(
+            self.__num * oDen - oNum * self.__den  # numerator
+            ,self.__den * oDen                     # denominator
+        )
 
 
     def intComp(self, other):
         """comparison result as a number -1/0/1 (is self less than, equal to, greater than other)"""
-        if self.isNegative != other.isNegative:
+        oNum, oDen = (other.__num, other.__den) if type(other) is Rational else Rational.__operand(other)
+        if (self.__num < 0) != (oNum < 0):
             # if signs are not equal, 
             # operands are not equal too,
             # and self is lesser if negative
-            return -1 if self.isNegative else 1
+            return -1 if self.__num < 0 else 1
 
-        if self.denominator == other.denominator:
-            num = (
-                      (self.intPart  * self.denominator  + self.numerator)
-                    - (other.intPart * other.denominator + other.numerator)
-            )
-            if num == 0: return 0
-            return self.intSign() if num > 0 else -self.intSign()
+        if self.__den == oDen:
+            left, right = self.__num, oNum
         else:
-            frac = self.sub(other)
-            if frac.isZero(): return 0
-            return frac.intSign()
+            # cross-multiplication, no intermediate fractions
+            left, right = self.__num * oDen, oNum * self.__den
+        return (left > right) - (left < right)
+
+    def __cross(self, other):
+        """numerators of self and other (Rational, int, fractions.Fraction or float) over the common denominator, or None"""
+        if type(other) is int:
+            return (self.__num, other * self.__den)
+        if isinstance(other, Rational):
+            oNum, oDen = other.__num, other.__den
+        elif isinstance(other, Fraction):
+            oNum, oDen = other.numerator, other.denominator
+        elif isinstance(other, float):
+            if not _isfinite(other):
+                # any fraction is less than inf and greater than -inf, nothing is comparable to nan (as in fractions.Fraction)
+                return (0.0, other)
+            # exact comparison with the binary value of float
+            oNum, oDen = other.as_integer_ratio()
+        else:
+            return None
+        if self.__den == oDen:
+            return (self.__num, oNum)
+        return (self.__num * oDen, oNum * self.__den)
+
+    def __eq__(self, other):
+        if type(other) is int:
+            return self.__den == 1 and self.__num == other
+        if isinstance(other, Rational):
+            # both are reduced
+            return self.__num == other.__num and self.__den == other.__den
+        if isinstance(other, Fraction):
+            return self.__num == other.numerator and self.__den == other.denominator
+        if isinstance(other, float):
+            # exact comparison with the binary value of float (as fractions.Fraction does)
+            if not _isfinite(other):
+                return False
+            return (self.__num, self.__den) == other.as_integer_ratio()
+        return NotImplemented
+
+    def __hash__(self):
+        # the same as the hash of equal int, float and fractions.Fraction (consistent with __eq__)
+        if self.__den == 1:
+            return hash(self.__num)
+        try:
+            inverse = pow(self.__den, -1, _hashInfo.modulus)
+        except ValueError:
+            # denominator is divisible by the modulus
+            hash_ = _hashInfo.inf
+        else:
+            hash_ = hash(hash(abs(self.__num)) * inverse)
+        hash_ = hash_ if self.__num >= 0 else -hash_
+        return -2 if hash_ == -1 else hash_
+
+    def __lt__(self, other):
+        cross = self.__cross(other)
+        if cross is None:
+            return NotImplemented
+        return cross[0] < cross[1]
+
+    def __le__(self, other):
+        cross = self.__cross(other)
+        if cross is None:
+            return NotImplemented
+        return cross[0] <= cross[1]
+
+    def __gt__(self, other):
+        cross = self.__cross(other)
+        if cross is None:
+            return NotImplemented
+        return cross[0] > cross[1]
+
+    def __ge__(self, other):
+        cross = self.__cross(other)
+        if cross is None:
+            return NotImplemented
+        return cross[0] >= cross[1]
 
     def reciprocal(self):
         """1/self"""
         if self.isZero():
             raise ZeroDivisionError('Reciprocal causes division by zero')
 
-        return Rational(
-            0                                                 # intPart
-            ,self.denominator                                 # numerator
-            ,self.intPart * self.denominator + self.numerator # denominator
-            ,self.isNegative                                  # isNegative
-        )
+        if self.__num < 0:
+            return Rational.__make(-self.__den, -self.__num)
+        return Rational.__make(self.__den, self.__num)
 
     def mul(self, other):
-        """multiplication"""
-        return Rational(
-            0                                                           # intPart
-            ,(
-                  (self.intPart  * self.denominator  + self.numerator)
-                * (other.intPart * other.denominator + other.numerator) 
-            )                                                           # numerator
-            ,self.denominator * other.denominator                       # denominator
-            ,(self.isNegative ^ other.isNegative)                       # isNegative
+        """multiplication (other may be Rational, int or fractions.Fraction)"""
+        oNum, oDen = (other.__num, other.__den) if type(other) is Rational else Rational.__operand(other)
+        # cross-cancelling before multiplying keeps the products small
+        # (and the result already reduced)
+        gcdA = _gcd(self.__num, oDen)
+        gcdB = _gcd(oNum, self.__den)
+        return Rational.__make(
+            (self.__num // gcdA) * (oNum // gcdB)   # numerator
+            ,(self.__den // gcdB) * (oDen // gcdA)  # denominator
         )
 
     def div(self, other):
-        """division"""
-        if other.isZero():
+        """division (other may be Rational, int or fractions.Fraction)"""
+        oNum, oDen = (other.__num, other.__den) if type(other) is Rational else Rational.__operand(other)
+        if oNum == 0:
             raise ZeroDivisionError('Division by zero')
-        return self.mul(other.reciprocal())
+        # multiplication by the reciprocal, without constructing it
+        gcdA = _gcd(self.__num, oNum)
+        gcdB = _gcd(self.__den, oDen)
+        num = (self.__num // gcdA) * (oDen // gcdB)
+        den = (self.__den // gcdB) * (oNum // gcdA)
+        if den < 0:
+            return Rational.__make(-num, -den)
+        return Rational.__make(num, den)
 
     def pow(self, exponent):
         if not type(exponent) is int:
             raise ValueError('exponent is not int')
         if exponent == 0:
-            return(Rational(1))
-        multiplicand = Rational(**self.dict())
+            return(Rational.__make(1, 1, True))
+        num, den = self.__num, self.__den
         if exponent < 0:
-            multiplicand = multiplicand.reciprocal()
-        if abs(exponent) == 1:
-            return (multiplicand)
-        multiplier   = Rational(**multiplicand.dict())
-        for i in range(abs(exponent) - 1):
-            multiplicand = multiplicand.mul(multiplier)
-        return(multiplicand)
+            if num == 0:
+                raise ZeroDivisionError('Reciprocal causes division by zero')
+            num, den = den, num
+            exponent = -exponent
+        # powers of the coprime numbers remain coprime, so no reduction is needed;
+        # int.__pow__ is square-and-multiply
+        num, den = num ** exponent, den ** exponent
+        if den < 0:
+            return Rational.__make(-num, -den)
+        return Rational.__make(num, den)
 
     @staticmethod
-    def shorter(numerator, denominator):
-        """defines a fraction as a canonical ratio [-]A/[-]N"""
-        absN = abs(numerator)
-        absD = abs(denominator)
-        return Rational(
-            intPart = 0
-            ,numerator = absN
-            ,denominator = absD
-            ,isNegative = ((absN != numerator) != (absD != denominator))
-        )
+    def from_int(value: int):
+        """integer as a fraction (no parsing and no checks except the type)"""
+        if type(value) is not int:
+            raise ValueError('value is not int')
+        return Rational.__make(value, 1, True)
 
     @staticmethod
-    def gcd(a: int, b: int) -> int:
-        """greatest common divisor"""
-        a, b = abs(a), abs(b)
-        if min(a,b) == 0:
-            return max(a,b,1)
+    def from_fraction(value: Fraction):
+        """fractions.Fraction as a fraction (it is already canonical)"""
+        if not isinstance(value, Fraction):
+            raise ValueError('value is not fractions.Fraction')
+        return Rational.__make(value.numerator, value.denominator)
 
-        while b > 0:
-            a,b = b, a%b
+    def as_fraction(self) -> Fraction:
+        """value as fractions.Fraction"""
+        return Fraction(self.__num, self.__den)
 
-        return a
+    @staticmethod
+    def shorter(numerator, denominator, isMixed: bool = False):
+        """defines a fraction as a canonical ratio [-]A/[-]N (with integer part extracted if isMixed)"""
+        if type(numerator) is not int or type(denominator) is not int or denominator == 0:
+            raise ValueError("incorrect part(s) of rational")
+        if denominator < 0:
+            return Rational.__make_reduced(-numerator, -denominator, isMixed)
+        return Rational.__make_reduced(numerator, denominator, isMixed)
+
+    @staticmethod
+    def sum(fracs):
+        """sum of many fractions (normalization is made once, see RationalAccumulator)"""
+        return RationalAccumulator(fracs).value()
+
+    @staticmethod
+    def gcd(a: int, b: int) -> int:
+        """greatest common divisor"""
+        return _gcd(a, b) or 1
 
     @staticmethod
     def lcm(a: int, b: int) -> int:
         """less common multiplier"""
-        a, b = abs(a), abs(b)
-        return (a//Rational.gcd(a,b))*b
+        return _lcm(a, b)
+
+
+class RationalAccumulator:
+
+    """Sum of many fractions with deferred normalization.
+
+    Terms are collected as plain integer sums by denominator;
+    the sums are brought to a common denominator and reduced only when the value is requested.
+
+    """
+
+    __slots__ = ('__sums',)
+
+    def __init__(self, fracs = ()):
+        self.__sums = {} # {denominator: sum of signed numerators}
+        for frac in fracs:
+            self.add(frac)
+
+    def add(self, frac):
+        """add a term, returns the accumulator itself"""
+        num, den = frac.ratio()
+        self.__sums[den] = self.__sums.get(den, 0) + num
+        return self
+
+    def value(self):
+        """the sum as a (reduced) Rational"""
+        num, den = 0, 1
+        for termDen, termNum in self.__sums.items():
+            if termDen == den:
+                num += termNum
+                continue
+            lcm_ = _lcm(den, termDen)
+            num  = num * (lcm_ // den) + termNum * (lcm_ // termDen)
+            den  = lcm_
+        return Rational.shorter(num, den)
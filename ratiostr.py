@@ -5,22 +5,120 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-# Версия 2023-02-21
+# Версия 2023-02-24
+
+import re
+from itertools import islice
 
 from rationals import Rational as Frac
 
 """Convert Rational numbers (fractions) from/to string"""
 
-class RatioString:
+def _compile_ratio(sprInt, sprFrac):
+    """regular expression of a fraction without sign: [I][sprInt[N]][sprFrac[D]]"""
+    return re.compile(
+        r'(\d*)(?:({sprI})(\d*))?(?:({sprF})(\d*))?'.format(sprI = re.escape(sprInt), sprF = re.escape(sprFrac))
+    )
+
+def _parts_from_groups(intPart, sprInt, numerator, sprFrac, denominator):
+    """tuple (intPart, numerator, denominator) of ints as written, from the groups of the ratio pattern (see _compile_ratio)"""
+    if sprFrac and not sprInt:
+        # separator sprFrac occurs without separator sprInt
+        # so the numerator was actually collected, not the intPart
+        numerator = intPart
+        intPart   = ''
+
+    if not denominator:
+        if intPart:
+            # it's a decimal fraction
+            denominator = '1' + '0'*len(numerator)
+        else:
+            intPart   = numerator
+            numerator = ''
+
+    return (
+        int(intPart)      if intPart     else 0
+        ,int(numerator)   if numerator   else 0
+        ,int(denominator) if denominator else 1
+    )
+
+def _ratio_from_groups(intPart, sprInt, numerator, sprFrac, denominator, isNegative):
+    """fraction from the groups of the ratio pattern (see _compile_ratio)"""
+    try:
+        return Frac(*_parts_from_groups(intPart, sprInt, numerator, sprFrac, denominator), isNegative)
+    except ValueError as err:
+        raise ValueError('error while parsing string to rational: ' + str(err))
+
+def _decimal_digits(frac):
+    """generator of the digits of the fractional part (long division), stops if the decimal notation is finite"""
+    num, den = frac.ratio()
+    rem = abs(num) % den
+    while rem:
+        digit, rem = divmod(rem * 10, den)
+        yield digit
+
+def _decimal_period(frac, limit = None):
+    """(pre-period length, period length) of the decimal notation, period is 0 for the finite notation;
+None if the period is longer than limit
+
+    """
+    den = frac.ratio()[1]
+    # the pre-period is defined by the factors 2 and 5 of the (reduced) denominator
+    twos = 0
+    while den % 2 == 0:
+        den //= 2
+        twos += 1
+    fives = 0
+    while den % 5 == 0:
+        den //= 5
+        fives += 1
+    prePeriod = max(twos, fives)
+    if den == 1:
+        return (prePeriod, 0)
+
+    # the period is the multiplicative order of 10 modulo the rest of the denominator
+    rem = 10 % den
+    period = 1
+    while rem != 1:
+        if limit != None and period >= limit:
+            return None
+        rem = rem * 10 % den
+        period += 1
+    return (prePeriod, period)
 
-    """Base convertation format is \"-I.N/D\""""
+class ParseError(ValueError):
 
-    __negasign = '-'
-    __sprInt   = '.'
-    __sprFrac  = '/'
+    """Incorrect input string; position is the offset (from 0) of the incorrect part in the string"""
+
+    def __init__(self, message, position):
+        super().__init__('{msg} (position {pos})'.format(msg = message, pos = position))
+        self.position = position
+
+class RatioFormat:
+
+    """Immutable convertation format \"-I.N/D\" with its own separators.
+
+    The parsing machinery is compiled once, in the constructor;
+    instances are not changed, so one instance can be shared between threads,
+    and different formats can be used at the same time.
+
+    """
+
+    __slots__ = ('__negasign', '__sprInt', '__sprFrac', '__ratio')
+
+    __sprDec   = '.' # decimal point of the decimal notation
+    __roundings = ('down', 'up', 'half_up', 'half_even')
+
+    def __init__(self, sprInt = '.', sprFrac = '/', negasign = '-'):
+        if not RatioFormat.is_separators_correct(negasign, sprInt, sprFrac):
+            raise ValueError('incorrect separators of rational format')
+        self.__negasign = negasign
+        self.__sprInt   = sprInt.strip()
+        self.__sprFrac  = sprFrac.strip()
+        self.__ratio    = _compile_ratio(self.__sprInt, self.__sprFrac)
 
     @staticmethod
-    def __is_separators_correct(negasign, sprInt, sprFrac):
+    def is_separators_correct(negasign, sprInt, sprFrac):
         return(
                 #must not match (i.e. with negasign)
                 len({negasign,sprInt,sprFrac}) == 3
@@ -34,27 +132,69 @@ class RatioString:
                 and sprFrac.strip() != ''
                 )
 
-    @classmethod
-    def set_separators(cls, sprInt, sprFrac):
-        if cls.__is_separators_correct(cls.__negasign, sprInt, sprFrac):
-            cls.__sprInt  = sprInt.strip()
-            cls.__sprFrac = sprFrac.strip()
-            return True
-        return False
+    @property
+    def negasign(self):
+        return(self.__negasign)
 
-    @classmethod
-    def to_string(cls, frac) -> str:
+    @property
+    def sprInt(self):
+        return(self.__sprInt)
+
+    @property
+    def sprFrac(self):
+        return(self.__sprFrac)
+
+    def to_string(self, frac) -> str:
         return(
             '{neg}{int}{sprI}{num}{sprF}{den}'.format(
                 int = str(frac.intPart), num = str(frac.numerator), den = str(frac.denominator)
-                ,neg = (cls.__negasign if frac.isNegative else '')
-                ,sprI = cls.__sprInt, sprF = cls.__sprFrac
+                ,neg = (self.__negasign if frac.isNegative else '')
+                ,sprI = self.__sprInt, sprF = self.__sprFrac
             )
         )
 
+    def to_decimal(self, frac, digits = 20, rounding = 'half_even', period = False) -> str:
+        """exact decimal notation: rounded to the digits of the fractional part
+(digits = 0 gives the rounded integer without the decimal separator);
+if period is True, the finite or periodic notation like \"0.1(6)\" is given when it fits the digits
 
-    @classmethod
-    def from_string(cls, instr = ''):
+        """
+        if rounding not in RatioFormat.__roundings:
+            raise ValueError('unknown rounding mode: ' + str(rounding))
+        if not (type(digits) is int and digits >= 0):
+            raise ValueError('number of digits must be int >= 0')
+
+        num, den = frac.ratio()
+        neg = self.__negasign if num < 0 else ''
+
+        if period and digits:
+            found = _decimal_period(frac, digits)
+            if found and sum(found) <= digits:
+                prePeriod, periodLen = found
+                fracDigits = ''.join([str(el) for el in islice(_decimal_digits(frac), prePeriod + periodLen)])
+                if periodLen:
+                    fracDigits = '{pre}({per})'.format(pre = fracDigits[:prePeriod], per = fracDigits[prePeriod:])
+                return '{neg}{int}{sprD}{frac}'.format(
+                    neg = neg, int = abs(num) // den, sprD = RatioFormat.__sprDec, frac = fracDigits or '0'
+                )
+
+        scale = 10 ** digits
+        quotient, rem = divmod(abs(num) * scale, den)
+        if rem and (
+            rounding == 'up'
+            or (rounding == 'half_up'   and 2 * rem >= den)
+            or (rounding == 'half_even' and (2 * rem > den or (2 * rem == den and quotient % 2)))
+        ):
+            quotient += 1
+        if not digits:
+            return '{neg}{int}'.format(neg = neg if quotient else '', int = quotient)
+        intPart, fracPart = divmod(quotient, scale)
+        fracDigits = str(fracPart).zfill(digits).rstrip('0')
+        return '{neg}{int}{sprD}{frac}'.format(
+            neg = neg if quotient else '', int = intPart, sprD = RatioFormat.__sprDec, frac = fracDigits or '0'
+        )
+
+    def from_string(self, instr = ''):
         """parse fraction from string like '-I.N/D', where ALL LAST parts of string (including seperstors) can be empty.
 returns tuple (fraction, tail-of-string)
 
@@ -63,65 +203,124 @@ returns tuple (fraction, tail-of-string)
         instr = instr.strip()
 
         #in the simplest case returns "zero", empty
-        if instr == '' or instr == cls.__negasign:
+        if instr == '' or instr == self.__negasign:
             return (Frac(), '')
 
         isNegative = False
         # first input symbol can be negative sign or none
-        if instr[0] == cls.__negasign:
+        if instr[0] == self.__negasign:
             isNegative = True
             instr = instr[1:].strip()
 
-        # string parts for constructing fraction from input
-        parts = {'intPart':'', 'numerator':'', 'denominator':''}
-
-        currKey  = 'intPart' #first suppose that you start to collect the integer part
-        switches = cls.__sprInt + cls.__sprFrac #separators toggles input part
-        wasTail = False
-        for i in range(len(instr)):
-            symb = instr[i]
-            if symb.isdigit():
-                # digits are collected in the selected part
-                parts[currKey] = parts[currKey] + symb
-                continue
-
-            # undefined symbol (not digit, not switch): finishes construction
-            if not symb in switches:
-                wasTail = True
-                break
-
-            # it's a switch
-            if symb == cls.__sprInt:
-                currKey  = 'numerator'
-                switches = cls.__sprFrac
-            else:
-                # it's sprFrac
-                if cls.__sprInt in switches:
-                    # separator sprFrac occurs before separator sprInt
-                    # so previously the numerator was actually constructed, not the intPart
-                    parts['numerator'] = parts['intPart']
-                    parts['intPart']   = ''
-                
-                currKey  = 'denominator'
-                switches = ''
-
-        if not parts['denominator']:
-            if parts['intPart']:
-                # it's a decimal fraction
-                parts['denominator'] = '1' + '0'*len(parts['numerator'])
-            else:
-                parts['intPart'] = parts['numerator']
-                parts['numerator'] = ''
-
-        outFrac = Frac().dict()
-        outFrac['isNegative'] = isNegative
-        for key in parts:
-            if parts[key] != '':
-                outFrac[key] = int(parts[key])
+        # the pattern always matches (all of its parts may be empty),
+        # everything after the match is the tail
+        match = self.__ratio.match(instr)
+        mFrac = _ratio_from_groups(*match.groups(''), isNegative)
+        return(mFrac, instr[match.end():])
+
+    def ratio_from_string(self, instr = ''):
+        """parse ratio from string like '-I.N/D' (see from_string) without reducing it:
+returns tuple ((signed numerator, denominator), tail-of-string), the denominator is as written
+(for the decimal fraction it is the power of 10)
+
+        """
+        instr = instr.strip()
+        isNegative = False
+        if instr[:1] == self.__negasign:
+            isNegative = True
+            instr = instr[1:].strip()
+        match = self.__ratio.match(instr)
+        intPart, numerator, denominator = _parts_from_groups(*match.groups(''))
+        if denominator < 1:
+            raise ValueError('error while parsing string to rational: zero denominator')
+        numerator += intPart * denominator
+        return((-numerator if isNegative else numerator, denominator), instr[match.end():])
+
+    def parse_many(self, strings):
+        """parse many strings (see from_string);
+returns tuple (results, errors): results are tuples (fraction, tail-of-string) or None for incorrect strings,
+errors are tuples (index, message)
+
+        """
+        results = []
+        errors  = []
+        for idx, instr in enumerate(strings):
+            try:
+                results.append(self.from_string(instr))
+            except ValueError as err:
+                results.append(None)
+                errors.append((idx, str(err)))
+        return(results, errors)
+
+
+class RatioString:
+
+    """Base convertation format is \"-I.N/D\"
+
+    Class methods use the default format of the class (see set_separators, set_format)
+    or the format passed explicitly.
+
+    """
+
+    __format = RatioFormat()
+
+    @classmethod
+    def get_format(cls):
+        """the default format of the class"""
+        return(cls.__format)
+
+    @classmethod
+    def set_format(cls, fmt):
+        """replace the default format of the class"""
+        if not isinstance(fmt, RatioFormat):
+            return False
+        cls.__format = fmt
+        return True
+
+    @classmethod
+    def set_separators(cls, sprInt, sprFrac):
         try:
-            mFrac = Frac(**outFrac)
-        except ValueError as err:
-            raise ValueError('error while parsing string to rational: ' + str(err))
+            fmt = RatioFormat(sprInt, sprFrac)
+        except ValueError:
+            return False
+        return cls.set_format(fmt)
 
-        return(mFrac,  instr[i:] if wasTail else '')
-        
+    @classmethod
+    def to_string(cls, frac, fmt = None) -> str:
+        return((fmt or cls.__format).to_string(frac))
+
+    @staticmethod
+    def decimal_digits(frac):
+        """generator of the digits of the fractional part (see _decimal_digits)"""
+        return(_decimal_digits(frac))
+
+    @staticmethod
+    def decimal_period(frac, limit = None):
+        """(pre-period length, period length) of the decimal notation (see _decimal_period)"""
+        return(_decimal_period(frac, limit))
+
+    @classmethod
+    def to_decimal(cls, frac, digits = 20, rounding = 'half_even', period = False, fmt = None) -> str:
+        """exact decimal notation (see RatioFormat.to_decimal)"""
+        return((fmt or cls.__format).to_decimal(frac, digits, rounding, period))
+
+    @classmethod
+    def from_string(cls, instr = '', fmt = None):
+        """parse fraction from string like '-I.N/D' (see RatioFormat.from_string)
+returns tuple (fraction, tail-of-string)
+
+        """
+        return((fmt or cls.__format).from_string(instr))
+
+    @classmethod
+    def ratio_from_string(cls, instr = '', fmt = None):
+        """parse ratio from string like '-I.N/D' without reducing it (see RatioFormat.ratio_from_string)
+returns tuple ((signed numerator, denominator), tail-of-string)
+
+        """
+        return((fmt or cls.__format).ratio_from_string(instr))
+
+    @classmethod
+    def parse_many(cls, strings, fmt = None):
+        """parse many strings (see RatioFormat.parse_many)"""
+        return((fmt or cls.__format).parse_many(strings))